@@ -4,11 +4,32 @@
 # ==========================
 import os
 import sys
-import xml.etree.ElementTree as ET
+import argparse
+from lxml import etree
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # figures are only saved to file, no GUI canvas needed
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
 from collections import defaultdict
+from array import array
+from multiprocessing.pool import ThreadPool
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional: bottleneck computes NaN-aware reductions in a single pass without a mask copy
+try:
+    from bottleneck import nanmean
+except ImportError:
+    from numpy import nanmean
+
+# Optional: numba compiles the per-timestep FCD aggregation, otherwise pandas groupby is used
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
 
 #%%
 # ==========================
@@ -18,6 +39,9 @@ from collections import defaultdict
 TIME_START = 900  # seconds
 TIME_END = 4500   # seconds
 
+# FCD TIME SERIES ARE SMOOTHED OVER AND THINNED TO EVERY N-TH TIMESTEP FOR PLOTTING (1 = full resolution)
+PLOT_DOWNSAMPLE = 5
+
 # RAMP EDGES TO EXCLUDE FROM SPEED CALCULATIONS
 # These are the ramp edges - exclude vehicles on these from network speed stats
 RAMP_EDGES = [
@@ -25,6 +49,7 @@ RAMP_EDGES = [
     'E34_THA', 'A34_THA', 'E36_WAED', 
     'E36_WAED_ACC', 'E35_HOR_ACC', 'E34_THA_ACC'
 ]
+RAMP_EDGES = frozenset(RAMP_EDGES)  # O(1) membership checks per vehicle
 
 # Get the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -57,6 +82,26 @@ scenarios = {
     }
 }
 
+# Display order of the scenarios in the summary chart and statistics
+SIT_ORDER = ('sit0', 'sit1', 'sit2', 'sit3')
+
+# COMMAND LINE OPTIONS
+# Defaults run the full comparison. Unknown arguments (e.g. from an interactive kernel) are ignored.
+parser = argparse.ArgumentParser(description='Compare the ramp metering scenarios.')
+parser.add_argument('--scenarios', nargs='+', choices=SIT_ORDER, default=list(SIT_ORDER),
+                    help='scenarios to include (default: all)')
+parser.add_argument('--plots', nargs='+', type=int, choices=range(1, 7), default=list(range(1, 7)),
+                    help='plot numbers to generate (default: all)')
+parser.add_argument('--no-cache', action='store_true', help='re-parse the XML output and ignore cached data')
+args, _ = parser.parse_known_args()
+
+scenarios = {sit: info for sit, info in scenarios.items() if sit in args.scenarios}
+PLOTS = set(args.plots)
+USE_CACHE = not args.no_cache
+# Only parse the data the selected plots actually use
+NEEDS_FCD = bool(PLOTS & {1, 2, 6})
+NEEDS_DETECTORS = bool(PLOTS & {3, 4, 5})
+
 output_dir = os.path.join(script_dir, 'simulation_output', 'comparison_plots')
 os.makedirs(output_dir, exist_ok=True)
 
@@ -66,79 +111,190 @@ print("="*60)
 print(f"Time range: {TIME_START}-{TIME_END} seconds")
 print(f"Output directory: {output_dir}\n")
 
+#%%
+# ==========================
+# PARSE CACHE
+# ==========================
+# Parsed XML output is stored as Parquet so re-running the plots does not re-parse the files.
+# Each source has one cache file that is overwritten in place; the time window and source
+# modification time it was built from are kept in a small '.key' file next to it.
+# Needs pyarrow or fastparquet; without either, the cache is silently skipped.
+def read_parquet_cache(cache_path, key):
+    if not USE_CACHE or not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path + '.key') as f:
+            if f.read() != key:
+                return None
+        return pd.read_parquet(cache_path)
+    except (ImportError, OSError):
+        return None
+
+def write_parquet_cache(frame, cache_path, key):
+    try:
+        # Drop the old key first, so an interrupted write never pairs a new key with old data
+        if os.path.exists(cache_path + '.key'):
+            os.remove(cache_path + '.key')
+        frame.to_parquet(cache_path, compression='zstd', index=False)
+        with open(cache_path + '.key', 'w') as f:
+            f.write(key)
+    except ImportError:
+        pass
+    except OSError as e:
+        print(f"    WARNING: Could not write cache {cache_path}: {e}")
+
 #%%
 # ==========================
 # PARSE FCD DATA FOR ALL SCENARIOS
 # ==========================
 print("Parsing FCD data for all scenarios...")
-print(f"  Excluding vehicles on ramp edges: {RAMP_EDGES}")
+print(f"  Excluding vehicles on ramp edges: {sorted(RAMP_EDGES)}")
+
+if HAVE_NUMBA:
+    @njit(cache=True, fastmath=True)
+    def aggregate_by_timestep(times, speeds, mainline, t_out, mean_out, std_out, count_out, count_mainline_out):
+        """Mainline speed mean/std and vehicle counts per timestep in a single pass over time-sorted records.
+        Returns the number of timesteps written to the output arrays."""
+        n = times.size
+        i = 0
+        k = 0
+        while i < n:
+            t = times[i]
+            s = 0.0
+            s2 = 0.0
+            c = 0
+            c_all = 0
+            while i < n and times[i] == t:
+                if mainline[i]:
+                    v = speeds[i]
+                    s += v
+                    s2 += v * v
+                    c += 1
+                c_all += 1
+                i += 1
+            t_out[k] = t
+            count_out[k] = c_all
+            count_mainline_out[k] = c
+            if c > 0:
+                mean = s / c
+                mean_out[k] = mean
+                std_out[k] = np.sqrt(max(s2 / c - mean * mean, 0.0))
+            else:
+                mean_out[k] = np.nan
+                std_out[k] = np.nan
+            k += 1
+        return k
 
 fcd_data = {}
 
-for sit_id, sit_info in scenarios.items():
+for sit_id, sit_info in (scenarios.items() if NEEDS_FCD else ()):
     print(f"\n  Processing {sit_info['name']}...")
     
-    time_data = defaultdict(lambda: {'speeds': [], 'speeds_mainline': [], 'count': 0, 'count_mainline': 0})
-    
     if not os.path.exists(sit_info['fcd_file']):
         print(f"    WARNING: FCD file not found: {sit_info['fcd_file']}")
         continue
     
-    context = ET.iterparse(sit_info['fcd_file'], events=('start', 'end'))
-    context = iter(context)
-    event, root = next(context)
+    # Parsed records are cached next to the FCD file, keyed by the time window and its modification time
+    fcd_cache = f"{sit_info['fcd_file']}.parquet"
+    fcd_key = f"{TIME_START}-{TIME_END}@{os.path.getmtime(sit_info['fcd_file'])!r}"
+    fcd_frame = read_parquet_cache(fcd_cache, fcd_key)
     
-    for event, elem in context:
-        if event == 'end' and elem.tag == 'timestep':
+    if fcd_frame is None:
+        # One flat record per vehicle and timestep (time, speed, on mainline), kept in typed
+        # buffers instead of per-timestep Python lists
+        time_buf = array('d')
+        speed_buf = array('f')
+        mainline_buf = array('b')
+        # There are only a few hundred distinct lanes, so resolve each lane to its mainline flag once
+        lane_is_mainline = {}
+        
+        # lxml parses in C and only hands back the finished <timestep> elements
+        for _, elem in etree.iterparse(sit_info['fcd_file'], events=('end',), tag='timestep'):
             time = float(elem.get('time'))
-            
-            if TIME_START <= time <= TIME_END:
-                for vehicle in elem.findall('vehicle'):
-                    speed = float(vehicle.get('speed', 0))
-                    lane = vehicle.get('lane', '')
+            # Timesteps are written in ascending order, nothing after the analysis window is needed
+            if time > TIME_END:
+                break
+        
+            if time >= TIME_START:
+                for vehicle in elem.iterchildren('vehicle'):
+                    attrib = vehicle.attrib
+                    speed = float(attrib.get('speed', 0))
+                    lane = attrib.get('lane', '')
                     
-                    # Extract edge from lane (format: edgeID_laneIndex)
-                    edge = lane.rsplit('_', 1)[0] if '_' in lane else lane
+                    is_mainline = lane_is_mainline.get(lane)
+                    if is_mainline is None:
+                        # Extract edge from lane (format: edgeID_laneIndex)
+                        edge, sep, _ = lane.rpartition('_')
+                        if not sep:
+                            edge = lane
+                        # Only mainline vehicles count for the speed metrics, not those on a ramp edge
+                        is_mainline = lane_is_mainline[lane] = edge not in RAMP_EDGES
                     
-                    speed_kmh = speed * 3.6
-                    time_data[time]['speeds'].append(speed_kmh)
-                    time_data[time]['count'] += 1
-                    
-                    # Only add to mainline data if not on a ramp edge
-                    if edge not in RAMP_EDGES:
-                        time_data[time]['speeds_mainline'].append(speed_kmh)
-                        time_data[time]['count_mainline'] += 1
-            
+                    time_buf.append(time)
+                    speed_buf.append(speed * 3.6)
+                    mainline_buf.append(is_mainline)
+        
+            # Free the handled timestep and drop the already processed siblings from the tree
             elem.clear()
-            root.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        
+        fcd_frame = pd.DataFrame({
+            'time': np.frombuffer(time_buf, dtype=np.float64),
+            'speed': np.frombuffer(speed_buf, dtype=np.float32),
+            'mainline': np.frombuffer(mainline_buf, dtype=np.int8).astype(bool)
+        })
+        
+        write_parquet_cache(fcd_frame, fcd_cache, fcd_key)
+    else:
+        print(f"    Loaded cached FCD records: {os.path.basename(fcd_cache)}")
     
-    # Compute aggregate statistics (using mainline data for speed metrics)
-    times = sorted(time_data.keys())
-    avg_speeds = []
-    vehicle_counts = []
-    speed_std = []
-    vehicle_counts_mainline = []
+    # Compute aggregate statistics per timestep (using mainline data for speed metrics)
+    record_times = fcd_frame['time'].to_numpy()
+    record_speeds = fcd_frame['speed'].to_numpy()
+    record_mainline = fcd_frame['mainline'].to_numpy()
     
-    for t in times:
-        speeds_mainline = time_data[t]['speeds_mainline']
-        if speeds_mainline:
-            avg_speeds.append(np.mean(speeds_mainline))
-            speed_std.append(np.std(speeds_mainline))
-        else:
-            avg_speeds.append(np.nan)
-            speed_std.append(np.nan)
-        vehicle_counts.append(time_data[t]['count'])
-        vehicle_counts_mainline.append(time_data[t]['count_mainline'])
+    if HAVE_NUMBA:
+        # FCD records arrive grouped by timestep in ascending order, so one sequential pass suffices
+        n = record_times.size
+        times = np.empty(n, dtype=np.float64)
+        avg_speeds = np.empty(n, dtype=np.float32)
+        speed_std = np.empty(n, dtype=np.float32)
+        vehicle_counts = np.empty(n, dtype=np.int32)
+        vehicle_counts_mainline = np.empty(n, dtype=np.int32)
+        k = aggregate_by_timestep(record_times, record_speeds, record_mainline,
+                                  times, avg_speeds, speed_std, vehicle_counts, vehicle_counts_mainline)
+        times, avg_speeds, speed_std = times[:k].astype(np.float32), avg_speeds[:k], speed_std[:k]
+        vehicle_counts, vehicle_counts_mainline = vehicle_counts[:k], vehicle_counts_mainline[:k]
+    else:
+        counts = fcd_frame.groupby('time', sort=True).size()
+        mainline_speeds = fcd_frame[fcd_frame['mainline']].groupby('time', sort=True)['speed']
+        times = counts.index.to_numpy(dtype=np.float32)
+        avg_speeds = mainline_speeds.mean().reindex(counts.index).to_numpy(dtype=np.float32)
+        speed_std = mainline_speeds.std(ddof=0).reindex(counts.index).to_numpy(dtype=np.float32)
+        vehicle_counts = counts.to_numpy(dtype=np.int32)
+        vehicle_counts_mainline = mainline_speeds.size().reindex(counts.index, fill_value=0).to_numpy(dtype=np.int32)
     
     fcd_data[sit_id] = {
-        'times': np.array(times),
-        'avg_speeds': np.array(avg_speeds),
-        'speed_std': np.array(speed_std),
-        'vehicle_counts': np.array(vehicle_counts),
-        'vehicle_counts_mainline': np.array(vehicle_counts_mainline),
-        'time_data': time_data
+        'times': times,
+        'avg_speeds': avg_speeds,
+        'speed_std': speed_std,
+        'vehicle_counts': vehicle_counts,
+        'vehicle_counts_mainline': vehicle_counts_mainline,
+        'speeds_mainline': record_speeds[record_mainline].astype(np.float32, copy=False)
     }
     
+    # Scenario statistics over all mainline speed observations, computed once for Plot 6 and the summary.
+    # Averaging over observations weights each timestep by its vehicle count.
+    speeds_mainline = fcd_data[sit_id]['speeds_mainline']
+    if speeds_mainline.size:
+        fcd_data[sit_id]['stats'] = {
+            'mean': speeds_mainline.mean(dtype=np.float64),
+            'std': speeds_mainline.std(dtype=np.float64),
+            'pct_free': 100 * np.count_nonzero(speeds_mainline >= 80) / speeds_mainline.size,
+            'pct_cong': 100 * np.count_nonzero(speeds_mainline < 50) / speeds_mainline.size
+        }
+    
     print(f"    Found data for {len(times)} timesteps")
     print(f"    Average mainline vehicles per timestep: {np.mean(vehicle_counts_mainline):.1f}")
 
@@ -148,308 +304,394 @@ for sit_id, sit_info in scenarios.items():
 # ==========================
 print("\nParsing detector data for all scenarios...")
 
-detector_data = {}
+DETECTOR_COLUMNS = ['det_id', 'time', 'speed', 'occupancy', 'flow']
 
-for sit_id, sit_info in scenarios.items():
-    print(f"\n  Processing {sit_info['name']} detectors...")
+def parse_one_detector_file(task):
+    """Parse one detector output file into flat columns, one row per interval inside the analysis window."""
+    sit_id, xml_path = task
+    det_ids, times, speeds, occupancies, flows = [], [], [], [], []
+    error = None
+    
+    try:
+        # Stream the intervals instead of building the whole tree first
+        for _, interval in etree.iterparse(xml_path, events=('end',), tag='interval'):
+            time_begin = float(interval.get('begin', 0))
+            time_end = float(interval.get('end', 0))
+            time_mid = (time_begin + time_end) / 2
+            
+            if TIME_START <= time_mid <= TIME_END:
+                # Convert every value before appending, so a bad attribute leaves the columns aligned
+                speed = float(interval.get('speed', -1))
+                occupancy = float(interval.get('occupancy', 0))
+                flow = float(interval.get('flow', 0))
+                
+                det_ids.append(interval.get('id'))
+                times.append(time_mid)
+                speeds.append(speed * 3.6 if speed >= 0 else np.nan)
+                occupancies.append(occupancy)
+                flows.append(flow)
+            
+            # Free the handled interval and drop the already processed siblings
+            interval.clear()
+            while interval.getprevious() is not None:
+                del interval.getparent()[0]
+    except (etree.XMLSyntaxError, OSError, ValueError) as e:
+        # Keep the intervals read before the error (broken XML, unreadable file or
+        # non-numeric attribute), but report the file instead of aborting the comparison
+        error = f"{os.path.basename(xml_path)}: {e}"
     
+    return sit_id, (det_ids, times, speeds, occupancies, flows), error
+
+# One task per (scenario, detector file) - all files are independent.
+# Scenarios whose cache was built from the current detector files and time window are not parsed again.
+tasks = []
+detector_caches = {}
+detector_keys = {}
+detector_frames = {}
+for sit_id, sit_info in (scenarios.items() if NEEDS_DETECTORS else ()):
     det_path = sit_info['detector_path']
     if not os.path.isdir(det_path):
-        print(f"    WARNING: Detector directory not found: {det_path}")
+        print(f"    WARNING: Detector directory not found for {sit_info['name']}: {det_path}")
+        continue
+    xml_paths = [os.path.join(det_path, f) for f in os.listdir(det_path) if f.endswith('.xml')]
+    if not xml_paths:
         continue
     
-    xml_files = [f for f in os.listdir(det_path) if f.endswith('.xml')]
-    
-    scenario_detectors = defaultdict(lambda: {
-        'time': [], 'speed': [], 'occupancy': [], 'flow': []
-    })
-    
-    for xml_file in xml_files:
-        try:
-            tree = ET.parse(os.path.join(det_path, xml_file))
-            root = tree.getroot()
-            
-            for interval in root.findall('interval'):
-                det_id = interval.get('id')
-                time_begin = float(interval.get('begin', 0))
-                time_end = float(interval.get('end', 0))
-                time_mid = (time_begin + time_end) / 2
-                
-                if TIME_START <= time_mid <= TIME_END:
-                    speed = float(interval.get('speed', -1))
-                    occupancy = float(interval.get('occupancy', 0))
-                    flow = float(interval.get('flow', 0))
-                    
-                    scenario_detectors[det_id]['time'].append(time_mid)
-                    scenario_detectors[det_id]['speed'].append(speed * 3.6 if speed >= 0 else np.nan)
-                    scenario_detectors[det_id]['occupancy'].append(occupancy)
-                    scenario_detectors[det_id]['flow'].append(flow)
-        except:
-            continue
-    
-    detector_data[sit_id] = scenario_detectors
-    print(f"    Found {len(scenario_detectors)} detectors")
+    # The key lists every detector file, so an added, removed or replaced file invalidates the cache
+    sources = sorted((os.path.basename(p), os.path.getmtime(p), os.path.getsize(p)) for p in xml_paths)
+    detector_caches[sit_id] = os.path.join(det_path, 'detectors.parquet')
+    detector_keys[sit_id] = f"{TIME_START}-{TIME_END}@{sources!r}"
+    detector_frames[sit_id] = read_parquet_cache(detector_caches[sit_id], detector_keys[sit_id])
+    if detector_frames[sit_id] is None:
+        tasks.extend((sit_id, p) for p in xml_paths)
+    else:
+        print(f"  {sit_info['name']}: loaded cached detector data")
+
+with ThreadPool(os.cpu_count()) as pool:
+    results = pool.map(parse_one_detector_file, tasks)
+
+# Concatenate the flat per-file columns of each freshly parsed scenario
+parsed_columns = defaultdict(lambda: ([], [], [], [], []))
+for sit_id, file_columns, error in results:
+    if error is not None:
+        print(f"    WARNING: Could not fully parse {error}")
+    for column, values in zip(parsed_columns[sit_id], file_columns):
+        column.extend(values)
+
+# One long-form table per scenario (one row per detector interval); speeds (km/h),
+# occupancies (%) and flows (veh/h) need no more than single precision
+for sit_id, (det_ids, times, speeds, occupancies, flows) in parsed_columns.items():
+    detector_frames[sit_id] = pd.DataFrame({
+        'det_id': pd.Categorical(det_ids),
+        'time': np.asarray(times, dtype=np.float32),
+        'speed': np.asarray(speeds, dtype=np.float32),
+        'occupancy': np.asarray(occupancies, dtype=np.float32),
+        'flow': np.asarray(flows, dtype=np.float32)
+    }, columns=DETECTOR_COLUMNS)
+    write_parquet_cache(detector_frames[sit_id], detector_caches[sit_id], detector_keys[sit_id])
+
+# Per-detector views, partitioned in a single groupby pass
+detector_data = {}
+for sit_id, det_frame in detector_frames.items():
+    if det_frame is None:
+        continue
+    detector_data[sit_id] = {
+        det_id: rows.reset_index(drop=True)
+        for det_id, rows in det_frame.groupby('det_id', observed=True, sort=False)
+    }
+
+for sit_id, scenario_detectors in detector_data.items():
+    print(f"  {scenarios[sit_id]['name']}: found {len(scenario_detectors)} detectors")
+
+#%%
+# ==========================
+# FIGURE OUTPUT
+# ==========================
+# Figures are built one after another on the main thread (pyplot state is not thread-safe),
+# but rendering and PNG compression in savefig run on worker threads while the next plot is built
+save_pool = ThreadPoolExecutor(max_workers=4)
+pending_saves = []
+
+def save_figure(fig, filename):
+    pending_saves.append((fig, filename, save_pool.submit(
+        fig.savefig, os.path.join(output_dir, filename), dpi=300, bbox_inches='tight')))
+
+def downsample(x, y, factor=PLOT_DOWNSAMPLE):
+    """Rolling mean over `factor` samples, then keep every `factor`-th point."""
+    if factor <= 1:
+        return x, y
+    return x[::factor], pd.Series(y).rolling(factor, min_periods=1).mean().to_numpy()[::factor]
+
+def add_scenario_lines(ax, key, label_suffix=''):
+    """Draw one time series per scenario as a single LineCollection and return legend proxies for it."""
+    sit_ids = list(fcd_data)
+    segments = [np.column_stack(downsample(fcd_data[sit]['times'], fcd_data[sit][key])) for sit in sit_ids]
+    colors = [scenarios[sit]['color'] for sit in sit_ids]
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=2, alpha=0.8))
+    ax.autoscale_view()
+    return [Line2D([], [], color=color, linewidth=2, alpha=0.8, label=f"{scenarios[sit]['name']}{label_suffix}")
+            for sit, color in zip(sit_ids, colors)]
 
 #%%
 # ==========================
 # PLOT 1: NETWORK-WIDE AVERAGE SPEED COMPARISON
 # ==========================
-print("\nGenerating Plot 1: Network-wide speed comparison...")
+if 1 in PLOTS:
+    print("\nGenerating Plot 1: Network-wide speed comparison...")
 
-fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = plt.subplots(figsize=(16, 6))
 
-for sit_id, data in fcd_data.items():
-    sit_info = scenarios[sit_id]
-    ax.plot(data['times'], data['avg_speeds'], 
-            label=sit_info['name'], color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax.axhline(y=80, color='green', linestyle='--', linewidth=1, alpha=0.5, label='Free flow (80 km/h)')
-ax.axhline(y=50, color='orange', linestyle='--', linewidth=1, alpha=0.5, label='Moderate (50 km/h)')
-ax.axhline(y=30, color='red', linestyle='--', linewidth=1, alpha=0.5, label='Congestion (30 km/h)')
-
-ax.set_xlabel('Time (seconds)', fontsize=12)
-ax.set_ylabel('Average Speed (km/h)', fontsize=12)
-ax.set_title('Network-Wide Average Speed Comparison', fontsize=14, fontweight='bold')
-ax.legend(loc='best', fontsize=11)
-ax.grid(True, alpha=0.3)
-ax.set_xlim([TIME_START, TIME_END])
-ax.set_ylim([0, 120])
-
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, '01_speed_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print("  Saved: 01_speed_comparison.png")
+    handles = add_scenario_lines(ax, 'avg_speeds')
+
+    # Reference speed levels, drawn as one collection
+    reference_speeds = [80, 50, 30]
+    reference_colors = ['green', 'orange', 'red']
+    reference_labels = ['Free flow (80 km/h)', 'Moderate (50 km/h)', 'Congestion (30 km/h)']
+    ax.hlines(reference_speeds, TIME_START, TIME_END, colors=reference_colors, linestyles='--', linewidth=1, alpha=0.5)
+    handles += [Line2D([], [], color=color, linestyle='--', linewidth=1, alpha=0.5, label=label)
+                for color, label in zip(reference_colors, reference_labels)]
+
+    ax.set_xlabel('Time (seconds)', fontsize=12)
+    ax.set_ylabel('Average Speed (km/h)', fontsize=12)
+    ax.set_title('Network-Wide Average Speed Comparison', fontsize=14, fontweight='bold')
+    ax.legend(handles=handles, loc='best', fontsize=11)
+    ax.grid(True, alpha=0.3)
+    ax.set_xlim([TIME_START, TIME_END])
+    ax.set_ylim([0, 120])
+
+    plt.tight_layout()
+    save_figure(fig, '01_speed_comparison.png')
 
 #%%
 # ==========================
 # PLOT 2: VEHICLE COUNT COMPARISON
 # ==========================
-print("\nGenerating Plot 2: Vehicle count comparison...")
+if 2 in PLOTS:
+    print("\nGenerating Plot 2: Vehicle count comparison...")
 
-fig, ax = plt.subplots(figsize=(16, 6))
+    fig, ax = plt.subplots(figsize=(16, 6))
 
-for sit_id, data in fcd_data.items():
-    sit_info = scenarios[sit_id]
-    ax.plot(data['times'], data['vehicle_counts_mainline'], 
-            label=f"{sit_info['name']} (Mainline)", color=sit_info['color'], linewidth=2, alpha=0.8)
+    handles = add_scenario_lines(ax, 'vehicle_counts_mainline', label_suffix=' (Mainline)')
 
-ax.set_xlabel('Time (seconds)', fontsize=12)
-ax.set_ylabel('Number of Vehicles', fontsize=12)
-ax.set_title('Mainline Vehicle Count in Network Comparison', fontsize=14, fontweight='bold')
-ax.legend(loc='best', fontsize=11)
-ax.grid(True, alpha=0.3)
-ax.set_xlim([TIME_START, TIME_END])
+    ax.set_xlabel('Time (seconds)', fontsize=12)
+    ax.set_ylabel('Number of Vehicles', fontsize=12)
+    ax.set_title('Mainline Vehicle Count in Network Comparison', fontsize=14, fontweight='bold')
+    ax.legend(handles=handles, loc='best', fontsize=11)
+    ax.grid(True, alpha=0.3)
+    ax.set_xlim([TIME_START, TIME_END])
 
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, '02_vehicle_count_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print("  Saved: 02_vehicle_count_comparison.png")
+    plt.tight_layout()
+    save_figure(fig, '02_vehicle_count_comparison.png')
 
 #%%
 # ==========================
-# PLOT 3: RAMP-SPECIFIC COMPARISONS (THALWIL)
+# HELPERS FOR RAMP COMPARISONS
 # ==========================
-print("\nGenerating Plot 3: Thalwil ramp comparison...")
-
-tha_mainline_detectors = ['SENS_A3_THA_MID0', 'SENS_A3_THA_MID1']
-tha_ramp_detector = 'SENS_E_THA'
+def mean_speed(det_data, det_ids):
+    """Average speed over several detectors per interval, ignoring intervals without vehicles."""
+    mat = np.vstack([np.asarray(det_data[d]['speed'], dtype=np.float32) for d in det_ids])
+    # The NaN-aware mean is only needed if some interval had no vehicles
+    return nanmean(mat, axis=0) if np.isnan(mat).any() else mat.mean(axis=0)
 
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
-
-# Mainline speed comparison
-for sit_id, det_data in detector_data.items():
-    sit_info = scenarios[sit_id]
-    if all(det in det_data for det in tha_mainline_detectors):
-        times = det_data[tha_mainline_detectors[0]]['time']
-        speeds = []
-        for i in range(len(times)):
-            speed_vals = [det_data[det]['speed'][i] for det in tha_mainline_detectors]
-            speeds.append(np.nanmean(speed_vals))
-        ax1.plot(times, speeds, label=f'{sit_info["name"]} - Mainline', 
-                color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax1.set_xlabel('Time (seconds)', fontsize=12)
-ax1.set_ylabel('Speed (km/h)', fontsize=12)
-ax1.set_title('Thalwil Ramp - Mainline Speed Comparison', fontsize=13, fontweight='bold')
-ax1.legend(loc='best', fontsize=10)
-ax1.grid(True, alpha=0.3)
-ax1.set_xlim([TIME_START, TIME_END])
-ax1.set_ylim([0, 120])
-
-# Ramp flow comparison
-for sit_id, det_data in detector_data.items():
-    sit_info = scenarios[sit_id]
-    if tha_ramp_detector in det_data:
-        times = det_data[tha_ramp_detector]['time']
-        flows = det_data[tha_ramp_detector]['flow']
-        ax2.plot(times, flows, label=f'{sit_info["name"]} - Ramp Flow', 
-                color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax2.set_xlabel('Time (seconds)', fontsize=12)
-ax2.set_ylabel('Flow (veh/h)', fontsize=12)
-ax2.set_title('Thalwil Ramp - Flow Comparison', fontsize=13, fontweight='bold')
-ax2.legend(loc='best', fontsize=10)
-ax2.grid(True, alpha=0.3)
-ax2.set_xlim([TIME_START, TIME_END])
-
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, '03_THA_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print("  Saved: 03_THA_comparison.png")
+#%%
+# ==========================
+# PLOT 3: RAMP-SPECIFIC COMPARISONS (THALWIL)
+# ==========================
+if 3 in PLOTS:
+    print("\nGenerating Plot 3: Thalwil ramp comparison...")
+
+    tha_mainline_detectors = ['SENS_A3_THA_MID0', 'SENS_A3_THA_MID1']
+    tha_ramp_detector = 'SENS_E_THA'
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
+
+    # Mainline speed comparison
+    for sit_id, det_data in detector_data.items():
+        sit_info = scenarios[sit_id]
+        if all(det in det_data for det in tha_mainline_detectors):
+            times = det_data[tha_mainline_detectors[0]]['time']
+            speeds = mean_speed(det_data, tha_mainline_detectors)
+            ax1.plot(times, speeds, label=f'{sit_info["name"]} - Mainline', 
+                    color=sit_info['color'], linewidth=2, alpha=0.8)
+
+    ax1.set_xlabel('Time (seconds)', fontsize=12)
+    ax1.set_ylabel('Speed (km/h)', fontsize=12)
+    ax1.set_title('Thalwil Ramp - Mainline Speed Comparison', fontsize=13, fontweight='bold')
+    ax1.legend(loc='best', fontsize=10)
+    ax1.grid(True, alpha=0.3)
+    ax1.set_xlim([TIME_START, TIME_END])
+    ax1.set_ylim([0, 120])
+
+    # Ramp flow comparison
+    for sit_id, det_data in detector_data.items():
+        sit_info = scenarios[sit_id]
+        if tha_ramp_detector in det_data:
+            times = det_data[tha_ramp_detector]['time']
+            flows = det_data[tha_ramp_detector]['flow']
+            ax2.plot(times, flows, label=f'{sit_info["name"]} - Ramp Flow', 
+                    color=sit_info['color'], linewidth=2, alpha=0.8)
+
+    ax2.set_xlabel('Time (seconds)', fontsize=12)
+    ax2.set_ylabel('Flow (veh/h)', fontsize=12)
+    ax2.set_title('Thalwil Ramp - Flow Comparison', fontsize=13, fontweight='bold')
+    ax2.legend(loc='best', fontsize=10)
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlim([TIME_START, TIME_END])
+
+    plt.tight_layout()
+    save_figure(fig, '03_THA_comparison.png')
 
 #%%
 # ==========================
 # PLOT 4: RAMP-SPECIFIC COMPARISONS (HORGEN)
 # ==========================
-print("\nGenerating Plot 4: Horgen ramp comparison...")
-
-hor_mainline_detectors = ['SENS_A3_HOR_MID0', 'SENS_A3_HOR_MID1']
-hor_ramp_detector = 'SENS_E_HOR'
-
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
-
-for sit_id, det_data in detector_data.items():
-    sit_info = scenarios[sit_id]
-    if all(det in det_data for det in hor_mainline_detectors):
-        times = det_data[hor_mainline_detectors[0]]['time']
-        speeds = []
-        for i in range(len(times)):
-            speed_vals = [det_data[det]['speed'][i] for det in hor_mainline_detectors]
-            speeds.append(np.nanmean(speed_vals))
-        ax1.plot(times, speeds, label=f'{sit_info["name"]} - Mainline', 
-                color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax1.set_xlabel('Time (seconds)', fontsize=12)
-ax1.set_ylabel('Speed (km/h)', fontsize=12)
-ax1.set_title('Horgen Ramp - Mainline Speed Comparison', fontsize=13, fontweight='bold')
-ax1.legend(loc='best', fontsize=10)
-ax1.grid(True, alpha=0.3)
-ax1.set_xlim([TIME_START, TIME_END])
-ax1.set_ylim([0, 120])
-
-for sit_id, det_data in detector_data.items():
-    sit_info = scenarios[sit_id]
-    if hor_ramp_detector in det_data:
-        times = det_data[hor_ramp_detector]['time']
-        flows = det_data[hor_ramp_detector]['flow']
-        ax2.plot(times, flows, label=f'{sit_info["name"]} - Ramp Flow', 
-                color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax2.set_xlabel('Time (seconds)', fontsize=12)
-ax2.set_ylabel('Flow (veh/h)', fontsize=12)
-ax2.set_title('Horgen Ramp - Flow Comparison', fontsize=13, fontweight='bold')
-ax2.legend(loc='best', fontsize=10)
-ax2.grid(True, alpha=0.3)
-ax2.set_xlim([TIME_START, TIME_END])
-
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, '04_HOR_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print("  Saved: 04_HOR_comparison.png")
+if 4 in PLOTS:
+    print("\nGenerating Plot 4: Horgen ramp comparison...")
+
+    hor_mainline_detectors = ['SENS_A3_HOR_MID0', 'SENS_A3_HOR_MID1']
+    hor_ramp_detector = 'SENS_E_HOR'
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
+
+    for sit_id, det_data in detector_data.items():
+        sit_info = scenarios[sit_id]
+        if all(det in det_data for det in hor_mainline_detectors):
+            times = det_data[hor_mainline_detectors[0]]['time']
+            speeds = mean_speed(det_data, hor_mainline_detectors)
+            ax1.plot(times, speeds, label=f'{sit_info["name"]} - Mainline', 
+                    color=sit_info['color'], linewidth=2, alpha=0.8)
+
+    ax1.set_xlabel('Time (seconds)', fontsize=12)
+    ax1.set_ylabel('Speed (km/h)', fontsize=12)
+    ax1.set_title('Horgen Ramp - Mainline Speed Comparison', fontsize=13, fontweight='bold')
+    ax1.legend(loc='best', fontsize=10)
+    ax1.grid(True, alpha=0.3)
+    ax1.set_xlim([TIME_START, TIME_END])
+    ax1.set_ylim([0, 120])
+
+    for sit_id, det_data in detector_data.items():
+        sit_info = scenarios[sit_id]
+        if hor_ramp_detector in det_data:
+            times = det_data[hor_ramp_detector]['time']
+            flows = det_data[hor_ramp_detector]['flow']
+            ax2.plot(times, flows, label=f'{sit_info["name"]} - Ramp Flow', 
+                    color=sit_info['color'], linewidth=2, alpha=0.8)
+
+    ax2.set_xlabel('Time (seconds)', fontsize=12)
+    ax2.set_ylabel('Flow (veh/h)', fontsize=12)
+    ax2.set_title('Horgen Ramp - Flow Comparison', fontsize=13, fontweight='bold')
+    ax2.legend(loc='best', fontsize=10)
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlim([TIME_START, TIME_END])
+
+    plt.tight_layout()
+    save_figure(fig, '04_HOR_comparison.png')
 
 #%%
 # ==========================
 # PLOT 5: RAMP-SPECIFIC COMPARISONS (WÄDENSWIL)
 # ==========================
-print("\nGenerating Plot 5: Wädenswil ramp comparison...")
-
-wae_mainline_detectors = ['SENS_A3_WAE_MID0', 'SENS_A3_WAE_MID1']
-wae_ramp_detector = 'SENS_E_WAE'
-
-fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
-
-for sit_id, det_data in detector_data.items():
-    sit_info = scenarios[sit_id]
-    if all(det in det_data for det in wae_mainline_detectors):
-        times = det_data[wae_mainline_detectors[0]]['time']
-        speeds = []
-        for i in range(len(times)):
-            speed_vals = [det_data[det]['speed'][i] for det in wae_mainline_detectors]
-            speeds.append(np.nanmean(speed_vals))
-        ax1.plot(times, speeds, label=f'{sit_info["name"]} - Mainline', 
-                color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax1.set_xlabel('Time (seconds)', fontsize=12)
-ax1.set_ylabel('Speed (km/h)', fontsize=12)
-ax1.set_title('Wädenswil Ramp - Mainline Speed Comparison', fontsize=13, fontweight='bold')
-ax1.legend(loc='best', fontsize=10)
-ax1.grid(True, alpha=0.3)
-ax1.set_xlim([TIME_START, TIME_END])
-ax1.set_ylim([0, 120])
-
-for sit_id, det_data in detector_data.items():
-    sit_info = scenarios[sit_id]
-    if wae_ramp_detector in det_data:
-        times = det_data[wae_ramp_detector]['time']
-        flows = det_data[wae_ramp_detector]['flow']
-        ax2.plot(times, flows, label=f'{sit_info["name"]} - Ramp Flow', 
-                color=sit_info['color'], linewidth=2, alpha=0.8)
-
-ax2.set_xlabel('Time (seconds)', fontsize=12)
-ax2.set_ylabel('Flow (veh/h)', fontsize=12)
-ax2.set_title('Wädenswil Ramp - Flow Comparison', fontsize=13, fontweight='bold')
-ax2.legend(loc='best', fontsize=10)
-ax2.grid(True, alpha=0.3)
-ax2.set_xlim([TIME_START, TIME_END])
-
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, '05_WAE_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print("  Saved: 05_WAE_comparison.png")
+if 5 in PLOTS:
+    print("\nGenerating Plot 5: Wädenswil ramp comparison...")
+
+    wae_mainline_detectors = ['SENS_A3_WAE_MID0', 'SENS_A3_WAE_MID1']
+    wae_ramp_detector = 'SENS_E_WAE'
+
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(16, 10))
+
+    for sit_id, det_data in detector_data.items():
+        sit_info = scenarios[sit_id]
+        if all(det in det_data for det in wae_mainline_detectors):
+            times = det_data[wae_mainline_detectors[0]]['time']
+            speeds = mean_speed(det_data, wae_mainline_detectors)
+            ax1.plot(times, speeds, label=f'{sit_info["name"]} - Mainline', 
+                    color=sit_info['color'], linewidth=2, alpha=0.8)
+
+    ax1.set_xlabel('Time (seconds)', fontsize=12)
+    ax1.set_ylabel('Speed (km/h)', fontsize=12)
+    ax1.set_title('Wädenswil Ramp - Mainline Speed Comparison', fontsize=13, fontweight='bold')
+    ax1.legend(loc='best', fontsize=10)
+    ax1.grid(True, alpha=0.3)
+    ax1.set_xlim([TIME_START, TIME_END])
+    ax1.set_ylim([0, 120])
+
+    for sit_id, det_data in detector_data.items():
+        sit_info = scenarios[sit_id]
+        if wae_ramp_detector in det_data:
+            times = det_data[wae_ramp_detector]['time']
+            flows = det_data[wae_ramp_detector]['flow']
+            ax2.plot(times, flows, label=f'{sit_info["name"]} - Ramp Flow', 
+                    color=sit_info['color'], linewidth=2, alpha=0.8)
+
+    ax2.set_xlabel('Time (seconds)', fontsize=12)
+    ax2.set_ylabel('Flow (veh/h)', fontsize=12)
+    ax2.set_title('Wädenswil Ramp - Flow Comparison', fontsize=13, fontweight='bold')
+    ax2.legend(loc='best', fontsize=10)
+    ax2.grid(True, alpha=0.3)
+    ax2.set_xlim([TIME_START, TIME_END])
+
+    plt.tight_layout()
+    save_figure(fig, '05_WAE_comparison.png')
 
 #%%
 # ==========================
 # PLOT 6: SUMMARY BAR CHARTS
 # ==========================
-print("\nGenerating Plot 6: Summary statistics comparison...")
-
-fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
-
-scenario_names = [scenarios[sit]['name'] for sit in ['sit0', 'sit1', 'sit2', 'sit3']]
-colors = [scenarios[sit]['color'] for sit in ['sit0', 'sit1', 'sit2', 'sit3']]
-
-# Average speed (mainline only)
-avg_speeds_summary = [np.nanmean(fcd_data[sit]['avg_speeds']) for sit in ['sit0', 'sit1', 'sit2', 'sit3'] if sit in fcd_data]
-ax1.bar(scenario_names[:len(avg_speeds_summary)], avg_speeds_summary, color=colors[:len(avg_speeds_summary)], alpha=0.7)
-ax1.set_ylabel('Average Speed (km/h)', fontsize=11)
-ax1.set_title('Network Average Speed (Mainline Only)', fontsize=12, fontweight='bold')
-ax1.grid(True, alpha=0.3, axis='y')
-
-# Average vehicle count (mainline)
-avg_counts = [np.mean(fcd_data[sit]['vehicle_counts_mainline']) for sit in ['sit0', 'sit1', 'sit2', 'sit3'] if sit in fcd_data]
-ax2.bar(scenario_names[:len(avg_counts)], avg_counts, color=colors[:len(avg_counts)], alpha=0.7)
-ax2.set_ylabel('Average Vehicle Count', fontsize=11)
-ax2.set_title('Average Vehicles in Network (Mainline)', fontsize=12, fontweight='bold')
-ax2.grid(True, alpha=0.3, axis='y')
-
-# Speed standard deviation (mainline only)
-speed_std_summary = [np.nanmean(fcd_data[sit]['speed_std']) for sit in ['sit0', 'sit1', 'sit2', 'sit3'] if sit in fcd_data]
-ax3.bar(scenario_names[:len(speed_std_summary)], speed_std_summary, color=colors[:len(speed_std_summary)], alpha=0.7)
-ax3.set_ylabel('Speed Std Dev (km/h)', fontsize=11)
-ax3.set_title('Speed Variability (Mainline Only)', fontsize=12, fontweight='bold')
-ax3.grid(True, alpha=0.3, axis='y')
-
-# Congestion percentage (speed < 50 km/h, mainline only)
-congestion_pct = []
-for sit in ['sit0', 'sit1', 'sit2', 'sit3']:
-    if sit in fcd_data:
-        all_speeds_mainline = []
-        for t in fcd_data[sit]['time_data'].values():
-            all_speeds_mainline.extend(t['speeds_mainline'])
-        if all_speeds_mainline:
-            pct = 100 * sum(s < 50 for s in all_speeds_mainline) / len(all_speeds_mainline)
-            congestion_pct.append(pct)
-
-ax4.bar(scenario_names[:len(congestion_pct)], congestion_pct, color=colors[:len(congestion_pct)], alpha=0.7)
-ax4.set_ylabel('Congestion (%)', fontsize=11)
-ax4.set_title('Percentage of Speeds < 50 km/h (Mainline Only)', fontsize=12, fontweight='bold')
-ax4.grid(True, alpha=0.3, axis='y')
-
-plt.suptitle('Scenario Comparison - Summary Statistics (Mainline Only)', fontsize=14, fontweight='bold', y=0.995)
-plt.tight_layout()
-plt.savefig(os.path.join(output_dir, '06_summary_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print("  Saved: 06_summary_comparison.png")
+if 6 in PLOTS:
+    print("\nGenerating Plot 6: Summary statistics comparison...")
+
+    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+
+    # Collect all bar values in one pass over the scenarios with mainline data, in display order
+    present = tuple(sit for sit in SIT_ORDER if 'stats' in fcd_data.get(sit, {}))
+    scenario_names = [scenarios[sit]['name'] for sit in present]
+    colors = [scenarios[sit]['color'] for sit in present]
+    avg_speeds_summary, avg_counts, speed_std_summary, congestion_pct = [], [], [], []
+    for sit in present:
+        data = fcd_data[sit]
+        avg_speeds_summary.append(data['stats']['mean'])
+        avg_counts.append(np.mean(data['vehicle_counts_mainline']))
+        speed_std_summary.append(data['stats']['std'])
+        congestion_pct.append(data['stats']['pct_cong'])
+
+    # Average speed (mainline only)
+    ax1.bar(scenario_names, avg_speeds_summary, color=colors, alpha=0.7)
+    ax1.set_ylabel('Average Speed (km/h)', fontsize=11)
+    ax1.set_title('Network Average Speed (Mainline Only)', fontsize=12, fontweight='bold')
+    ax1.grid(True, alpha=0.3, axis='y')
+
+    # Average vehicle count (mainline)
+    ax2.bar(scenario_names, avg_counts, color=colors, alpha=0.7)
+    ax2.set_ylabel('Average Vehicle Count', fontsize=11)
+    ax2.set_title('Average Vehicles in Network (Mainline)', fontsize=12, fontweight='bold')
+    ax2.grid(True, alpha=0.3, axis='y')
+
+    # Speed standard deviation (mainline only)
+    ax3.bar(scenario_names, speed_std_summary, color=colors, alpha=0.7)
+    ax3.set_ylabel('Speed Std Dev (km/h)', fontsize=11)
+    ax3.set_title('Speed Variability (Mainline Only)', fontsize=12, fontweight='bold')
+    ax3.grid(True, alpha=0.3, axis='y')
+
+    # Congestion percentage (speed < 50 km/h, mainline only)
+    ax4.bar(scenario_names, congestion_pct, color=colors, alpha=0.7)
+    ax4.set_ylabel('Congestion (%)', fontsize=11)
+    ax4.set_title('Percentage of Speeds < 50 km/h (Mainline Only)', fontsize=12, fontweight='bold')
+    ax4.grid(True, alpha=0.3, axis='y')
+
+    plt.suptitle('Scenario Comparison - Summary Statistics (Mainline Only)', fontsize=14, fontweight='bold', y=0.995)
+    plt.tight_layout()
+    save_figure(fig, '06_summary_comparison.png')
+
+#%%
+# ==========================
+# WAIT FOR FIGURE OUTPUT
+# ==========================
+for fig, filename, future in pending_saves:
+    future.result()
+    plt.close(fig)
+    print(f"  Saved: {filename}")
+pending_saves.clear()
+save_pool.shutdown()
 
 #%%
 # ==========================
@@ -459,7 +701,7 @@ print("\n" + "="*60)
 print("COMPARATIVE SUMMARY STATISTICS (MAINLINE ONLY)")
 print("="*60)
 
-for sit_id in ['sit0', 'sit1', 'sit2', 'sit3']:
+for sit_id in SIT_ORDER:
     if sit_id not in fcd_data:
         continue
     
@@ -467,18 +709,15 @@ for sit_id in ['sit0', 'sit1', 'sit2', 'sit3']:
     data = fcd_data[sit_id]
     
     print(f"\n{sit_info['name']}:")
-    print(f"  Average speed (mainline): {np.nanmean(data['avg_speeds']):.2f} km/h")
     print(f"  Average vehicle count (all): {np.mean(data['vehicle_counts']):.1f} vehicles")
     print(f"  Average vehicle count (mainline): {np.mean(data['vehicle_counts_mainline']):.1f} vehicles")
-    print(f"  Speed std deviation (mainline): {np.nanmean(data['speed_std']):.2f} km/h")
-    
-    all_speeds_mainline = []
-    for t in data['time_data'].values():
-        all_speeds_mainline.extend(t['speeds_mainline'])
     
-    if all_speeds_mainline:
-        print(f"  % Free flow (≥80 km/h, mainline): {100 * sum(s >= 80 for s in all_speeds_mainline) / len(all_speeds_mainline):.1f}%")
-        print(f"  % Congested (<50 km/h, mainline): {100 * sum(s < 50 for s in all_speeds_mainline) / len(all_speeds_mainline):.1f}%")
+    if 'stats' in data:
+        stats = data['stats']
+        print(f"  Average speed (mainline): {stats['mean']:.2f} km/h")
+        print(f"  Speed std deviation (mainline): {stats['std']:.2f} km/h")
+        print(f"  % Free flow (≥80 km/h, mainline): {stats['pct_free']:.1f}%")
+        print(f"  % Congested (<50 km/h, mainline): {stats['pct_cong']:.1f}%")
 
 print("\n" + "="*60)
 print(f"All comparison plots saved to: {output_dir}")
@@ -7,9 +7,17 @@ import sys
 import xml.etree.ElementTree as ET
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # figures are only saved to file, no GUI canvas needed
 import matplotlib.pyplot as plt
 from collections import defaultdict
 
+# Optional: bottleneck computes NaN-aware reductions in a single pass without a mask copy
+try:
+    from bottleneck import nanmean
+except ImportError:
+    from numpy import nanmean
+
 #%%
 # ==========================
 # CONFIGURATION
@@ -82,50 +90,92 @@ print(f"Saving plots to: {output_dir}")
 # ==========================
 # PARSE DETECTOR DATA
 # ==========================
-print("\nParsing detector XML files...")
-
-# Data storage by detector location
-detector_data = defaultdict(lambda: {
-    'time': [],
-    'speed': [],
-    'occupancy': [],
-    'nVehContrib': [],
-    'flow': []
-})
-
-# Parse all detector output XML files
-for detector_file in detector_files:
-    print(f"  Processing: {os.path.basename(detector_file)}")
-    try:
-        tree = ET.parse(detector_file)
-        root = tree.getroot()
-        
-        # In SUMO detector output, intervals are directly under root
-        # Each interval has the detector ID as an attribute
-        for interval in root.findall('interval'):
-            det_id = interval.get('id')  # Detector ID is in the interval tag
-            time_begin = float(interval.get('begin', 0))
-            time_end = float(interval.get('end', 0))
-            time_mid = (time_begin + time_end) / 2
-            
-            # Only process data within the specified time range
-            if TIME_START <= time_mid <= TIME_END:
-                # Get metrics from interval attributes
-                speed = float(interval.get('speed', -1))
-                occupancy = float(interval.get('occupancy', 0))
-                nVehContrib = int(interval.get('nVehContrib', 0))
-                flow = float(interval.get('flow', 0))  # Flow is already calculated by SUMO
-                
-                # Store data
-                detector_data[det_id]['time'].append(time_mid)
-                detector_data[det_id]['speed'].append(speed * 3.6 if speed >= 0 else np.nan)  # Convert m/s to km/h
-                detector_data[det_id]['occupancy'].append(occupancy)
-                detector_data[det_id]['nVehContrib'].append(nVehContrib)
-                detector_data[det_id]['flow'].append(flow)
+# The parsed series are cached as .npz next to the detector output, together with the name,
+# modification time and size of every detector file they were parsed from. The cache is only
+# reused while that list is unchanged, so re-running the analysis skips the XML parsing
+cache_file = os.path.join(os.path.dirname(os.path.normpath(detector_path)), f'detector_data_{TIME_START}_{TIME_END}.npz')
+detector_sources = sorted(f"{os.path.basename(f)}|{os.path.getmtime(f)!r}|{os.path.getsize(f)}" for f in detector_files)
+
+detector_data = None
+if os.path.isfile(cache_file):
+    with np.load(cache_file) as cache:
+        if 'sources' in cache.files and cache['sources'].tolist() == detector_sources:
+            print(f"\nLoading cached detector data: {cache_file}")
+            detector_data = {}
+            for key in cache.files:
+                if key == 'sources':
+                    continue
+                det_id, field = key.rsplit('|', 1)
+                detector_data.setdefault(det_id, {})[field] = cache[key]
+
+if detector_data is None:
+    print("\nParsing detector XML files...")
+
+    # Raw attribute strings by detector location; they are converted to numbers in bulk after parsing
+    raw_data = defaultdict(lambda: {
+        'begin': [],
+        'end': [],
+        'speed': [],
+        'occupancy': [],
+        'nVehContrib': [],
+        'flow': []
+    })
+
+    # Parse all detector output XML files
+    parse_failed = False
+    for detector_file in detector_files:
+        print(f"  Processing: {os.path.basename(detector_file)}")
+        try:
+            # In SUMO detector output, intervals are directly under root
+            # Each interval has the detector ID as an attribute
+            # Stream the file: every interval is handled as soon as it is read and then freed,
+            # so the document is never held in memory as a whole
+            context = ET.iterparse(detector_file, events=('start', 'end'))
+            _, root = next(context)
+            for event, interval in context:
+                if event != 'end' or interval.tag != 'interval':
+                    continue
+                get = interval.get
+                raw = raw_data[get('id')]  # Detector ID is in the interval tag
+                raw['begin'].append(get('begin', '0'))
+                raw['end'].append(get('end', '0'))
+                raw['speed'].append(get('speed', '-1'))  # m/s, -1 if no vehicle passed
+                raw['occupancy'].append(get('occupancy', '0'))
+                raw['nVehContrib'].append(get('nVehContrib', '0'))
+                raw['flow'].append(get('flow', '0'))  # Flow is already calculated by SUMO
+                # Drop the handled intervals from the root as well, not only their contents
+                root.clear()
         
-    except Exception as e:
-        print(f"    Warning: Could not parse {os.path.basename(detector_file)}: {e}")
-        continue
+        except Exception as e:
+            print(f"    Warning: Could not parse {os.path.basename(detector_file)}: {e}")
+            parse_failed = True
+            continue
+
+    # Convert the attribute strings with NumPy's C parser instead of one float() call per value,
+    # then keep only the intervals within the specified time range
+    detector_data = {}
+    for det_id, raw in raw_data.items():
+        time_mid = (np.asarray(raw['begin'], dtype=np.float64) + np.asarray(raw['end'], dtype=np.float64)) / 2
+        in_range = (time_mid >= TIME_START) & (time_mid <= TIME_END)
+        if not in_range.any():
+            continue
+        # Convert m/s to km/h in one pass; intervals without vehicles (speed -1) become NaN
+        raw_speed = np.asarray(raw['speed'], dtype=np.float32)[in_range]
+        detector_data[det_id] = {
+            'time': time_mid[in_range].astype(np.float32),
+            'speed': np.where(raw_speed >= 0, raw_speed * np.float32(3.6), np.float32(np.nan)),
+            'occupancy': np.asarray(raw['occupancy'], dtype=np.float32)[in_range],
+            'nVehContrib': np.asarray(raw['nVehContrib'], dtype=np.int32)[in_range],
+            'flow': np.asarray(raw['flow'], dtype=np.float32)[in_range]
+        }
+    del raw_data
+
+    # Only cache complete results, a file that failed to parse is retried on the next run
+    if detector_data and not parse_failed:
+        np.savez_compressed(cache_file, sources=np.array(detector_sources),
+                            **{f'{det_id}|{field}': values
+                               for det_id, series in detector_data.items()
+                               for field, values in series.items()})
 
 print(f"\nParsing complete. Found {len(detector_data)} detectors with data in analysis period.")
 
@@ -139,74 +189,71 @@ if len(detector_data) == 0:
 
 #%%
 # ==========================
-# PLOT 1: THALWIL (THA) RAMP ANALYSIS
+# RAMP ANALYSIS PLOT
 # ==========================
-print("\nGenerating Plot 1: Thalwil ramp analysis...")
+def mean_speed(speeds):
+    """Mean over the detector axis; the NaN-aware mean is only needed if some interval had no vehicles."""
+    return nanmean(speeds, axis=0) if np.isnan(speeds).any() else speeds.mean(axis=0)
 
-# Define detector groups for THA
-tha_mainline_detectors = ['SENS_A3_THA_MID0', 'SENS_A3_THA_MID1']
-tha_after_merge_detectors = ['SENS_A3_THA_N0', 'SENS_A3_THA_N1']
-tha_ramp_detector = 'SENS_E_THA'
+# One figure is shared by the three ramp plots; every call clears and redraws its axes
+ramp_fig, (ramp_ax1, ramp_ax2) = plt.subplots(2, 1, figsize=(14, 10))
+ramp_ax1_twin = ramp_ax1.twinx()
 
-# Aggregate mainline data (before merge)
-if all(det in detector_data for det in tha_mainline_detectors):
-    times = detector_data[tha_mainline_detectors[0]]['time']
+def plot_ramp_analysis(ramp_name, mainline_detectors, after_merge_detectors, ramp_detector, filename,
+                       fig=ramp_fig, ax1=ramp_ax1, ax2=ramp_ax2, ax1_twin=ramp_ax1_twin):
+    """Occupancy/flow and speed before and after the merge of one on-ramp, saved as one figure."""
+    if not all(det in detector_data for det in mainline_detectors):
+        return
     
-    tha_mainline_speed = []
-    tha_mainline_occ = []
-    tha_mainline_flow = []
+    # Series are NumPy arrays from parsing (or the cache); asarray is a no-op for them
+    times = np.asarray(detector_data[mainline_detectors[0]]['time'])
     
-    for i in range(len(times)):
-        speeds = [detector_data[det]['speed'][i] for det in tha_mainline_detectors]
-        occs = [detector_data[det]['occupancy'][i] for det in tha_mainline_detectors]
-        flows = [detector_data[det]['flow'][i] for det in tha_mainline_detectors]
-        
-        tha_mainline_speed.append(np.nanmean(speeds))
-        tha_mainline_occ.append(np.mean(occs))
-        tha_mainline_flow.append(np.sum(flows))
+    # Aggregate mainline data (before merge): stack the detectors into (detectors, intervals)
+    # arrays and reduce across detectors
+    mainline_speed = mean_speed(np.stack([detector_data[det]['speed'] for det in mainline_detectors]))
+    mainline_occ = np.stack([detector_data[det]['occupancy'] for det in mainline_detectors]).mean(axis=0)
+    mainline_flow = np.stack([detector_data[det]['flow'] for det in mainline_detectors]).sum(axis=0)
     
     # Get after-merge data
-    tha_after_speed = []
-    tha_after_occ = []
-    
-    for i in range(len(times)):
-        speeds = [detector_data[det]['speed'][i] for det in tha_after_merge_detectors]
-        occs = [detector_data[det]['occupancy'][i] for det in tha_after_merge_detectors]
-        
-        tha_after_speed.append(np.nanmean(speeds))
-        tha_after_occ.append(np.mean(occs))
-    
-    # Get ramp data
-    tha_ramp_speed = detector_data[tha_ramp_detector]['speed'] if tha_ramp_detector in detector_data else []
-    tha_ramp_flow = detector_data[tha_ramp_detector]['flow'] if tha_ramp_detector in detector_data else []
-    
-    # Create plots
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
+    after_speed = mean_speed(np.stack([detector_data[det]['speed'] for det in after_merge_detectors]))
+    after_occ = np.stack([detector_data[det]['occupancy'] for det in after_merge_detectors]).mean(axis=0)
+    
+    # Get ramp data (None when the ramp detector has no output, so the ramp lines are skipped)
+    ramp_data = detector_data.get(ramp_detector)
+    ramp_speed = np.asarray(ramp_data['speed']) if ramp_data is not None else None
+    ramp_flow = np.asarray(ramp_data['flow']) if ramp_data is not None else None
+    
+    # Reset the shared axes; clear() also resets the twin axis to the left side, so move it back
+    ax1.clear()
+    ax1_twin.clear()
+    ax2.clear()
+    ax1_twin.yaxis.tick_right()
+    ax1_twin.yaxis.set_label_position('right')
+    ax1_twin.patch.set_visible(False)
     
     # Top plot: Occupancy and flow
-    ax1_twin = ax1.twinx()
-    ax1.plot(times, tha_mainline_occ, label='Occupancy Before Merge (%)', color='cyan', linewidth=2)
-    ax1.plot(times, tha_after_occ, label='Occupancy After Merge (%)', color='blue', linewidth=2)
-    ax1_twin.plot(times, tha_mainline_flow, label='Mainline Flow (veh/h)', color='red', linewidth=2, linestyle='--')
-    if tha_ramp_flow:
-        ax1_twin.plot(times, tha_ramp_flow, label='Ramp Flow (veh/h)', color='purple', linewidth=2, linestyle='--')
+    ax1.plot(times, mainline_occ, label='Occupancy Before Merge (%)', color='cyan', linewidth=2)
+    ax1.plot(times, after_occ, label='Occupancy After Merge (%)', color='blue', linewidth=2)
+    ax1_twin.plot(times, mainline_flow, label='Mainline Flow (veh/h)', color='red', linewidth=2, linestyle='--')
+    if ramp_flow is not None and len(ramp_flow) > 0:
+        ax1_twin.plot(times, ramp_flow, label='Ramp Flow (veh/h)', color='purple', linewidth=2, linestyle='--')
     
     ax1.set_xlabel('Time (seconds)', fontsize=12)
     ax1.set_ylabel('Occupancy (%)', fontsize=12, color='blue')
     ax1_twin.set_ylabel('Flow (veh/h)', fontsize=12, color='red')
     ax1.tick_params(axis='y', labelcolor='blue')
     ax1_twin.tick_params(axis='y', labelcolor='red')
-    ax1.set_title(f'Thalwil Ramp - Occupancy and Flow Analysis ({situation_name})', fontsize=14, fontweight='bold')
+    ax1.set_title(f'{ramp_name} Ramp - Occupancy and Flow Analysis ({situation_name})', fontsize=14, fontweight='bold')
     ax1.legend(loc='upper left')
     ax1_twin.legend(loc='upper right')
     ax1.grid(True, alpha=0.3)
     ax1.set_xlim([TIME_START, TIME_END])
     
     # Bottom plot: Speed comparison
-    ax2.plot(times, tha_mainline_speed, label='Speed Before Merge (km/h)', color='green', linewidth=2)
-    ax2.plot(times, tha_after_speed, label='Speed After Merge (km/h)', color='darkgreen', linewidth=2)
-    if tha_ramp_speed:
-        ax2.plot(times, tha_ramp_speed, label='Ramp Speed (km/h)', color='orange', linewidth=2)
+    ax2.plot(times, mainline_speed, label='Speed Before Merge (km/h)', color='green', linewidth=2)
+    ax2.plot(times, after_speed, label='Speed After Merge (km/h)', color='darkgreen', linewidth=2)
+    if ramp_speed is not None and len(ramp_speed) > 0:
+        ax2.plot(times, ramp_speed, label='Ramp Speed (km/h)', color='orange', linewidth=2)
     
     ax2.axhline(y=80, color='green', linestyle='--', linewidth=1, alpha=0.5)
     ax2.axhline(y=50, color='orange', linestyle='--', linewidth=1, alpha=0.5)
@@ -220,10 +267,23 @@ if all(det in detector_data for det in tha_mainline_detectors):
     ax2.set_ylim([0, 120])
     ax2.set_xlim([TIME_START, TIME_END])
     
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '08_THA_detector_analysis.png'), dpi=300, bbox_inches='tight')
-    plt.close()
-    print(f"  Saved: 08_THA_detector_analysis.png")
+    # tight_layout already fits the axes into the figure, so the 300 dpi raster is rendered only
+    # once (bbox_inches='tight' would draw the whole figure a second time to measure it)
+    fig.tight_layout()
+    fig.savefig(os.path.join(output_dir, filename), dpi=300)
+    print(f"  Saved: {filename}")
+
+#%%
+# ==========================
+# PLOT 1: THALWIL (THA) RAMP ANALYSIS
+# ==========================
+print("\nGenerating Plot 1: Thalwil ramp analysis...")
+
+plot_ramp_analysis('Thalwil',
+                   ['SENS_A3_THA_MID0', 'SENS_A3_THA_MID1'],
+                   ['SENS_A3_THA_N0', 'SENS_A3_THA_N1'],
+                   'SENS_E_THA',
+                   '08_THA_detector_analysis.png')
 
 #%%
 # ==========================
@@ -231,81 +291,11 @@ if all(det in detector_data for det in tha_mainline_detectors):
 # ==========================
 print("\nGenerating Plot 2: Horgen ramp analysis...")
 
-hor_mainline_detectors = ['SENS_A3_HOR_MID0', 'SENS_A3_HOR_MID1']
-hor_after_merge_detectors = ['SENS_A3_HOR_N0', 'SENS_A3_HOR_N1']
-hor_ramp_detector = 'SENS_E_HOR'
-
-if all(det in detector_data for det in hor_mainline_detectors):
-    times = detector_data[hor_mainline_detectors[0]]['time']
-    
-    # Similar processing as THA
-    hor_mainline_speed = []
-    hor_mainline_occ = []
-    hor_mainline_flow = []
-    
-    for i in range(len(times)):
-        speeds = [detector_data[det]['speed'][i] for det in hor_mainline_detectors]
-        occs = [detector_data[det]['occupancy'][i] for det in hor_mainline_detectors]
-        flows = [detector_data[det]['flow'][i] for det in hor_mainline_detectors]
-        
-        hor_mainline_speed.append(np.nanmean(speeds))
-        hor_mainline_occ.append(np.mean(occs))
-        hor_mainline_flow.append(np.sum(flows))
-    
-    hor_after_speed = []
-    hor_after_occ = []
-    
-    for i in range(len(times)):
-        speeds = [detector_data[det]['speed'][i] for det in hor_after_merge_detectors]
-        occs = [detector_data[det]['occupancy'][i] for det in hor_after_merge_detectors]
-        
-        hor_after_speed.append(np.nanmean(speeds))
-        hor_after_occ.append(np.mean(occs))
-    
-    hor_ramp_speed = detector_data[hor_ramp_detector]['speed'] if hor_ramp_detector in detector_data else []
-    hor_ramp_flow = detector_data[hor_ramp_detector]['flow'] if hor_ramp_detector in detector_data else []
-    
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
-    
-    ax1_twin = ax1.twinx()
-    ax1.plot(times, hor_mainline_occ, label='Occupancy Before Merge (%)', color='cyan', linewidth=2)
-    ax1.plot(times, hor_after_occ, label='Occupancy After Merge (%)', color='blue', linewidth=2)
-    ax1_twin.plot(times, hor_mainline_flow, label='Mainline Flow (veh/h)', color='red', linewidth=2, linestyle='--')
-    if hor_ramp_flow:
-        ax1_twin.plot(times, hor_ramp_flow, label='Ramp Flow (veh/h)', color='purple', linewidth=2, linestyle='--')
-    
-    ax1.set_xlabel('Time (seconds)', fontsize=12)
-    ax1.set_ylabel('Occupancy (%)', fontsize=12, color='blue')
-    ax1_twin.set_ylabel('Flow (veh/h)', fontsize=12, color='red')
-    ax1.tick_params(axis='y', labelcolor='blue')
-    ax1_twin.tick_params(axis='y', labelcolor='red')
-    ax1.set_title(f'Horgen Ramp - Occupancy and Flow Analysis ({situation_name})', fontsize=14, fontweight='bold')
-    ax1.legend(loc='upper left')
-    ax1_twin.legend(loc='upper right')
-    ax1.grid(True, alpha=0.3)
-    ax1.set_xlim([TIME_START, TIME_END])
-    
-    ax2.plot(times, hor_mainline_speed, label='Speed Before Merge (km/h)', color='green', linewidth=2)
-    ax2.plot(times, hor_after_speed, label='Speed After Merge (km/h)', color='darkgreen', linewidth=2)
-    if hor_ramp_speed:
-        ax2.plot(times, hor_ramp_speed, label='Ramp Speed (km/h)', color='orange', linewidth=2)
-    
-    ax2.axhline(y=80, color='green', linestyle='--', linewidth=1, alpha=0.5)
-    ax2.axhline(y=50, color='orange', linestyle='--', linewidth=1, alpha=0.5)
-    ax2.axhline(y=30, color='red', linestyle='--', linewidth=1, alpha=0.5)
-    
-    ax2.set_xlabel('Time (seconds)', fontsize=12)
-    ax2.set_ylabel('Speed (km/h)', fontsize=12)
-    ax2.set_title('Speed Comparison: Mainline vs Ramp', fontsize=12, fontweight='bold')
-    ax2.legend(loc='best')
-    ax2.grid(True, alpha=0.3)
-    ax2.set_ylim([0, 120])
-    ax2.set_xlim([TIME_START, TIME_END])
-    
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '09_HOR_detector_analysis.png'), dpi=300, bbox_inches='tight')
-    plt.close()
-    print(f"  Saved: 09_HOR_detector_analysis.png")
+plot_ramp_analysis('Horgen',
+                   ['SENS_A3_HOR_MID0', 'SENS_A3_HOR_MID1'],
+                   ['SENS_A3_HOR_N0', 'SENS_A3_HOR_N1'],
+                   'SENS_E_HOR',
+                   '09_HOR_detector_analysis.png')
 
 #%%
 # ==========================
@@ -313,80 +303,13 @@ if all(det in detector_data for det in hor_mainline_detectors):
 # ==========================
 print("\nGenerating Plot 3: Wädenswil ramp analysis...")
 
-wae_mainline_detectors = ['SENS_A3_WAE_MID0', 'SENS_A3_WAE_MID1']
-wae_after_merge_detectors = ['SENS_A3_WAE_N0', 'SENS_A3_WAE_N1']
-wae_ramp_detector = 'SENS_E_WAE'
+plot_ramp_analysis('Wädenswil',
+                   ['SENS_A3_WAE_MID0', 'SENS_A3_WAE_MID1'],
+                   ['SENS_A3_WAE_N0', 'SENS_A3_WAE_N1'],
+                   'SENS_E_WAE',
+                   '10_WAE_detector_analysis.png')
 
-if all(det in detector_data for det in wae_mainline_detectors):
-    times = detector_data[wae_mainline_detectors[0]]['time']
-    
-    wae_mainline_speed = []
-    wae_mainline_occ = []
-    wae_mainline_flow = []
-    
-    for i in range(len(times)):
-        speeds = [detector_data[det]['speed'][i] for det in wae_mainline_detectors]
-        occs = [detector_data[det]['occupancy'][i] for det in wae_mainline_detectors]
-        flows = [detector_data[det]['flow'][i] for det in wae_mainline_detectors]
-        
-        wae_mainline_speed.append(np.nanmean(speeds))
-        wae_mainline_occ.append(np.mean(occs))
-        wae_mainline_flow.append(np.sum(flows))
-    
-    wae_after_speed = []
-    wae_after_occ = []
-    
-    for i in range(len(times)):
-        speeds = [detector_data[det]['speed'][i] for det in wae_after_merge_detectors]
-        occs = [detector_data[det]['occupancy'][i] for det in wae_after_merge_detectors]
-        
-        wae_after_speed.append(np.nanmean(speeds))
-        wae_after_occ.append(np.mean(occs))
-    
-    wae_ramp_speed = detector_data[wae_ramp_detector]['speed'] if wae_ramp_detector in detector_data else []
-    wae_ramp_flow = detector_data[wae_ramp_detector]['flow'] if wae_ramp_detector in detector_data else []
-    
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
-    
-    ax1_twin = ax1.twinx()
-    ax1.plot(times, wae_mainline_occ, label='Occupancy Before Merge (%)', color='cyan', linewidth=2)
-    ax1.plot(times, wae_after_occ, label='Occupancy After Merge (%)', color='blue', linewidth=2)
-    ax1_twin.plot(times, wae_mainline_flow, label='Mainline Flow (veh/h)', color='red', linewidth=2, linestyle='--')
-    if wae_ramp_flow:
-        ax1_twin.plot(times, wae_ramp_flow, label='Ramp Flow (veh/h)', color='purple', linewidth=2, linestyle='--')
-    
-    ax1.set_xlabel('Time (seconds)', fontsize=12)
-    ax1.set_ylabel('Occupancy (%)', fontsize=12, color='blue')
-    ax1_twin.set_ylabel('Flow (veh/h)', fontsize=12, color='red')
-    ax1.tick_params(axis='y', labelcolor='blue')
-    ax1_twin.tick_params(axis='y', labelcolor='red')
-    ax1.set_title(f'Wädenswil Ramp - Occupancy and Flow Analysis ({situation_name})', fontsize=14, fontweight='bold')
-    ax1.legend(loc='upper left')
-    ax1_twin.legend(loc='upper right')
-    ax1.grid(True, alpha=0.3)
-    ax1.set_xlim([TIME_START, TIME_END])
-    
-    ax2.plot(times, wae_mainline_speed, label='Speed Before Merge (km/h)', color='green', linewidth=2)
-    ax2.plot(times, wae_after_speed, label='Speed After Merge (km/h)', color='darkgreen', linewidth=2)
-    if wae_ramp_speed:
-        ax2.plot(times, wae_ramp_speed, label='Ramp Speed (km/h)', color='orange', linewidth=2)
-    
-    ax2.axhline(y=80, color='green', linestyle='--', linewidth=1, alpha=0.5)
-    ax2.axhline(y=50, color='orange', linestyle='--', linewidth=1, alpha=0.5)
-    ax2.axhline(y=30, color='red', linestyle='--', linewidth=1, alpha=0.5)
-    
-    ax2.set_xlabel('Time (seconds)', fontsize=12)
-    ax2.set_ylabel('Speed (km/h)', fontsize=12)
-    ax2.set_title('Speed Comparison: Mainline vs Ramp', fontsize=12, fontweight='bold')
-    ax2.legend(loc='best')
-    ax2.grid(True, alpha=0.3)
-    ax2.set_ylim([0, 120])
-    ax2.set_xlim([TIME_START, TIME_END])
-    
-    plt.tight_layout()
-    plt.savefig(os.path.join(output_dir, '10_WAE_detector_analysis.png'), dpi=300, bbox_inches='tight')
-    plt.close()
-    print(f"  Saved: 10_WAE_detector_analysis.png")
+plt.close(ramp_fig)
 
 #%%
 # ==========================
@@ -7,6 +7,8 @@ import sys
 import xml.etree.ElementTree as ET
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # figures are only saved to file, no GUI canvas needed
 import matplotlib.pyplot as plt
 from collections import defaultdict
 
@@ -27,6 +29,7 @@ RAMP_EDGES = [
     'A36_WAED', 'E35_HOR', 'A35_HOR',
     'E34_THA', 'A34_THA', 'E36_WAED'
 ]
+RAMP_EDGES = frozenset(RAMP_EDGES)  # O(1) membership checks per vehicle
 
 # Get the directory where this script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -64,7 +67,7 @@ print(f"Saving plots to: {output_dir}")
 # PARSE FCD DATA
 # ==========================
 print("\nParsing FCD XML file...")
-print(f"  Excluding vehicles on ramp edges: {RAMP_EDGES}")
+print(f"  Excluding vehicles on ramp edges: {sorted(RAMP_EDGES)}")
 
 # Data storage
 vehicle_data = defaultdict(lambda: {'time': [], 'speed': [], 'speed_mainline': [], 'x': [], 'y': [], 'lane': [], 'edge': []})
@@ -75,13 +78,19 @@ context = ET.iterparse(fcd_file, events=('start', 'end'))
 context = iter(context)
 event, root = next(context)
 
+# There are only a few hundred distinct lanes, so each lane ID is split into its edge once
+lane_to_edge = {}
+
 timestep_count = 0
 for event, elem in context:
     if event == 'end' and elem.tag == 'timestep':
         time = float(elem.get('time'))
+        # Timesteps are written in ascending order, nothing after the analysis window is needed
+        if time > TIME_END:
+            break
         
         # Only process data within the specified time range
-        if TIME_START <= time <= TIME_END:
+        if time >= TIME_START:
             for vehicle in elem.findall('vehicle'):
                 veh_id = vehicle.get('id')
                 speed = float(vehicle.get('speed', 0))
@@ -90,7 +99,9 @@ for event, elem in context:
                 lane = vehicle.get('lane', '')
                 
                 # Extract edge from lane (format: edgeID_laneIndex)
-                edge = lane.rsplit('_', 1)[0] if '_' in lane else lane
+                edge = lane_to_edge.get(lane)
+                if edge is None:
+                    edge = lane_to_edge[lane] = lane.rpartition('_')[0] if '_' in lane else lane
                 
                 speed_kmh = speed * 3.6  # Convert m/s to km/h
                 
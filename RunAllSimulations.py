@@ -0,0 +1,75 @@
+#%%
+# ==========================
+# PYTHON IMPORTS
+# ==========================
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+#%%
+# ==========================
+# CONFIGURATION
+# ==========================
+# Get the directory where this script is located
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Scenario folder and run script of every situation
+scenarios = {
+    'sit0': ('scenario_0_Base', 'RunSimulation_Sit0.py'),
+    'sit1': ('scenario_1_ALINEA', 'RunSimulation_Sit1.py'),
+    'sit2': ('scenario_2_ALINEA+HERO', 'RunSimulation_Sit2.py'),
+    'sit3': ('scenario_3_ALINEA_long', 'RunSimulation_Sit3.py'),
+}
+
+# COMMAND LINE OPTIONS
+# Each scenario is an independent, single-threaded SUMO run, so they are started side by side.
+# Unknown arguments (e.g. from an interactive kernel) are ignored.
+parser = argparse.ArgumentParser(description='Run the ramp metering scenarios in parallel.')
+parser.add_argument('--scenarios', nargs='+', choices=list(scenarios), default=list(scenarios),
+                    help='scenarios to run (default: all)')
+parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                    help='maximum number of simulations running at once (default: number of CPUs)')
+args, _ = parser.parse_known_args()
+
+#%%
+# ==========================
+# RUN SIMULATIONS
+# ==========================
+# The console output of each run goes to a log file next to its simulation output,
+# so the progress lines of parallel runs do not interleave
+def start_run(sit):
+    folder, run_script = scenarios[sit]
+    log_dir = os.path.join(script_dir, 'simulation_output', folder)
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = open(os.path.join(log_dir, f'run_{sit}.log'), 'w')
+    process = subprocess.Popen([sys.executable, run_script],
+                               cwd=os.path.join(script_dir, 'simulation_models', folder),
+                               stdout=log_file, stderr=subprocess.STDOUT)
+    print(f"Started {sit}: {folder}/{run_script}")
+    return process, log_file
+
+pending = list(args.scenarios)
+running = {}
+failed = []
+start_time = time.perf_counter()
+while pending or running:
+    while pending and len(running) < max(1, args.jobs):
+        sit = pending.pop(0)
+        running[sit] = start_run(sit)
+    for sit, (process, log_file) in list(running.items()):
+        if process.poll() is None:
+            continue
+        log_file.close()
+        del running[sit]
+        print(f"Finished {sit} (exit code {process.returncode}) after {time.perf_counter() - start_time:.0f} s")
+        if process.returncode != 0:
+            failed.append(sit)
+    if running:
+        time.sleep(1)
+
+if failed:
+    print(f"Failed: {', '.join(failed)} - see simulation_output/<scenario>/run_<sit>.log")
+    sys.exit(1)
+print("All simulations finished.")
@@ -7,14 +7,25 @@ Date: 2025-11-25
 """
 
 import os
-import xml.etree.ElementTree as ET
+from functools import lru_cache
+from collections import defaultdict
+from lxml import etree as ET
+import matplotlib
+matplotlib.use('Agg')  # figures are only saved to file, no GUI canvas needed
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from matplotlib.patches import Rectangle
+from matplotlib.collections import PatchCollection
 import pandas as pd
 import numpy as np
 from typing import Dict, Tuple
-import openpyxl  # For Excel export
+
+# Optional: xlsxwriter writes the Excel export faster than openpyxl, which is used otherwise
+try:
+    import xlsxwriter
+    EXCEL_ENGINE = 'xlsxwriter'
+except ImportError:
+    EXCEL_ENGINE = 'openpyxl'
 
 # Configuration constants
 PLOT_STYLE = {
@@ -24,6 +35,7 @@ PLOT_STYLE = {
     'axes.titlesize': 13,
     'legend.fontsize': 9,
 }
+plt.rcParams.update(PLOT_STYLE)  # applied once for every figure of this script
 
 COLOR_SCHEME = {
     'mainline': '#1f77b4',
@@ -33,6 +45,14 @@ COLOR_SCHEME = {
     'merge': '#ff9896',
 }
 
+# (color, alpha) of a junction by SUMO junction type
+JUNCTION_STYLE = {
+    'traffic_light': ('red', 0.9),
+    'priority': ('orange', 0.7),
+    'unregulated': ('gray', 0.6),
+}
+DEFAULT_JUNCTION_STYLE = ('orange', 0.7)
+
 # Fixed dimensions for visualization
 HORIZONTAL_EDGE_WIDTH = 200
 LANE_HEIGHT = 25  # Halved from 50 to 25
@@ -40,118 +60,129 @@ VERTICAL_EDGE_HEIGHT = 100
 LANE_WIDTH = 50
 
 
-def parse_network_xml(xml_file: str = 'shared_simulation_files/Network.net.xml') -> Dict:
-    """Parse SUMO network XML file and extract edge information."""
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+@lru_cache(maxsize=None)
+def _load_network(xml_file: str, mtime: float) -> Tuple[Dict, Dict, Dict]:
+    """Parse edges, junctions and traffic light junctions in one streaming pass over a SUMO network XML."""
     edges_data = {}
-
-    for edge in root.findall('edge'):
-        edge_id = edge.get('id')
-        if edge_id.startswith(':'):
-            continue
-
-        lanes = edge.findall('lane')
-        if lanes:
-            first_lane = lanes[0]
-            speed_ms = float(first_lane.get('speed', 0))
-            length_m = float(first_lane.get('length', 0))  # <-- LENGTH EXTRACTED HERE
-        else:
-            speed_ms = 0
-            length_m = 0
-
-        edges_data[edge_id] = {
-            'id': edge_id,
-            'from': edge.get('from', ''),
-            'to': edge.get('to', ''),
-            'priority': edge.get('priority', ''),
-            'num_lanes': len(lanes),
-            'speed_ms': speed_ms,
-            'speed_kmh': speed_ms * 3.6,
-            'length_m': length_m,  # <-- STORED IN EDGES DICTIONARY
-        }
-
-    return edges_data
-
-
-def parse_junctions(xml_file: str = 'shared_simulation_files/Network.net.xml') -> Dict:
-    """Parse junction information from SUMO network XML."""
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
     junctions = {}
-
-    for junction in root.findall('junction'):
-        junction_id = junction.get('id')
-        junctions[junction_id] = {
-            'id': junction_id,
-            'x': float(junction.get('x', 0)),
-            'y': float(junction.get('y', 0)),
-            'type': junction.get('type'),
-            'internal_edges': []
-        }
-
-    for edge in root.findall('edge'):
-        edge_id = edge.get('id')
-        if edge_id.startswith(':'):
-            parts = edge_id[1:].split('_')
-            if len(parts) >= 2:
-                junction_id = '_'.join(parts[:-1])
-                lanes = edge.findall('lane')
-                if lanes and junction_id in junctions:
+    tl_junctions = {}
+    internal_lanes = {}  # junction ID -> lanes of its internal edges (junctions follow the edges in .net.xml)
+
+    for _, elem in ET.iterparse(xml_file, events=('end',), tag=('edge', 'junction')):
+        if elem.tag == 'edge':
+            edge_id = elem.get('id')
+            lanes = elem.findall('lane')
+            if edge_id.startswith(':'):
+                parts = edge_id[1:].split('_')
+                if len(parts) >= 2:
+                    junction_id = '_'.join(parts[:-1])
                     for lane in lanes:
-                        junctions[junction_id]['internal_edges'].append({
+                        internal_lanes.setdefault(junction_id, []).append({
                             'edge_id': edge_id,
                             'lane_id': lane.get('id'),
                             'length_m': float(lane.get('length', 0)),
                             'speed_ms': float(lane.get('speed', 0)),
                             'speed_kmh': float(lane.get('speed', 0)) * 3.6
                         })
+            else:
+                if lanes:
+                    first_lane = lanes[0]
+                    speed_ms = float(first_lane.get('speed', 0))
+                    length_m = float(first_lane.get('length', 0))  # <-- LENGTH EXTRACTED HERE
+                else:
+                    speed_ms = 0
+                    length_m = 0
+
+                edges_data[edge_id] = {
+                    'id': edge_id,
+                    'from': elem.get('from', ''),
+                    'to': elem.get('to', ''),
+                    'priority': elem.get('priority', ''),
+                    'num_lanes': len(lanes),
+                    'speed_ms': speed_ms,
+                    'speed_kmh': speed_ms * 3.6,
+                    'length_m': length_m,  # <-- STORED IN EDGES DICTIONARY
+                }
+        else:
+            junction_id = elem.get('id')
+            junctions[junction_id] = {
+                'id': junction_id,
+                'x': float(elem.get('x', 0)),
+                'y': float(elem.get('y', 0)),
+                'type': elem.get('type'),
+                'internal_edges': []
+            }
+            if elem.get('type') == 'traffic_light':
+                tl_junctions[junction_id] = {
+                    'id': junction_id,
+                    'x': junctions[junction_id]['x'],
+                    'y': junctions[junction_id]['y']
+                }
+
+        # Free the processed element and its already handled siblings
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+    for junction_id, lanes in internal_lanes.items():
+        if junction_id in junctions:
+            junctions[junction_id]['internal_edges'].extend(lanes)
+
+    return edges_data, junctions, tl_junctions
+
+
+def _parse_network(xml_file: str) -> Tuple[Dict, Dict, Dict]:
+    """Parsed (edges, junctions, tl_junctions) of a network file, re-parsed only when the file changes.
+
+    The cached dicts are shared between callers and must not be modified.
+    """
+    return _load_network(xml_file, os.path.getmtime(xml_file))
 
-    return junctions
+
+def parse_network_xml(xml_file: str = 'shared_simulation_files/Network.net.xml') -> Dict:
+    """Parse SUMO network XML file and extract edge information."""
+    return _parse_network(xml_file)[0]
+
+
+def parse_junctions(xml_file: str = 'shared_simulation_files/Network.net.xml') -> Dict:
+    """Parse junction information from SUMO network XML."""
+    return _parse_network(xml_file)[1]
 
 
 def parse_detectors(detector_file: str = 'shared_simulation_files/detectors.add.xml') -> Dict:
-    """Parse detector information from detectors.add.xml."""
-    tree = ET.parse(detector_file)
-    root = tree.getroot()
+    """Parse detector information from detectors.add.xml (cached until the file changes)."""
+    return _load_detectors(detector_file, os.path.getmtime(detector_file))
+
+
+@lru_cache(maxsize=None)
+def _load_detectors(detector_file: str, mtime: float) -> Dict:
+    """Parse the induction loops and lane area detectors of a detector XML."""
     detectors = {'induction_loops': [], 'lane_area_detectors': []}
 
-    for loop in root.findall('inductionLoop'):
-        detectors['induction_loops'].append({
-            'id': loop.get('id'),
-            'lane': loop.get('lane'),
-            'pos': float(loop.get('pos', 0)),
-            'type': 'point'
-        })
-
-    for area in root.findall('laneAreaDetector'):
-        detectors['lane_area_detectors'].append({
-            'id': area.get('id'),
-            'lane': area.get('lane'),
-            'pos': float(area.get('pos', 0)),
-            'length': float(area.get('length', 0)),
-            'type': 'zone'
-        })
+    for _, elem in ET.iterparse(detector_file, events=('end',), tag=('inductionLoop', 'laneAreaDetector')):
+        if elem.tag == 'inductionLoop':
+            detectors['induction_loops'].append({
+                'id': elem.get('id'),
+                'lane': elem.get('lane'),
+                'pos': float(elem.get('pos', 0)),
+                'type': 'point'
+            })
+        else:
+            detectors['lane_area_detectors'].append({
+                'id': elem.get('id'),
+                'lane': elem.get('lane'),
+                'pos': float(elem.get('pos', 0)),
+                'length': float(elem.get('length', 0)),
+                'type': 'zone'
+            })
+        elem.clear()
 
     return detectors
 
 
 def parse_traffic_lights(xml_file: str = 'shared_simulation_files/Network_TL.net.xml') -> Dict:
     """Parse traffic light information from network XML."""
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    tl_junctions = {}
-
-    for junction in root.findall('junction'):
-        if junction.get('type') == 'traffic_light':
-            junction_id = junction.get('id')
-            tl_junctions[junction_id] = {
-                'id': junction_id,
-                'x': float(junction.get('x', 0)),
-                'y': float(junction.get('y', 0))
-            }
-
-    return tl_junctions
+    return _parse_network(xml_file)[2]
 
 
 def categorize_edge(edge_id: str) -> str:
@@ -178,66 +209,75 @@ def get_section(edge_id: str) -> str:
     return 'Unknown'
 
 
+# Edges of the edge list in their order along the network
+SEQUENTIAL_ORDER = (
+    'A3_WAED_S', 'A3_WAED_MID', 'E36_WAED', 'E36_WAED_ACC', 'A3_WAED_MERG', 'A36_WAED',
+    'A3_HOR_S', 'A3_HOR_MID', 'E35_HOR', 'E35_HOR_ACC', 'A3_HOR_MERG', 'A35_HOR',
+    'A3_THA_S', 'A3_THA_MID', 'E34_THA', 'E34_THA_ACC', 'A3_THA_MERG', 'A34_THA', 'A3_THA_N',
+)
+
+# (category, section) of every listed edge, resolved once at import
+EDGE_META = {edge_id: (categorize_edge(edge_id), get_section(edge_id)) for edge_id in SEQUENTIAL_ORDER}
+
+
 def create_edge_dataframe(edges: Dict, detectors: Dict = None) -> pd.DataFrame:
     """Create a pandas DataFrame from edges dictionary with detector information."""
-    sequential_order = [
-        'A3_WAED_S', 'A3_WAED_MID', 'E36_WAED', 'E36_WAED_ACC', 'A3_WAED_MERG', 'A36_WAED',
-        'A3_HOR_S', 'A3_HOR_MID', 'E35_HOR', 'E35_HOR_ACC', 'A3_HOR_MERG', 'A35_HOR',
-        'A3_THA_S', 'A3_THA_MID', 'E34_THA', 'E34_THA_ACC', 'A3_THA_MERG', 'A34_THA', 'A3_THA_N',
-    ]
-
-    detector_map = {}
+    # Detector IDs and types per edge (induction loops first, each in file order)
+    detector_ids = defaultdict(list)
+    detector_types = defaultdict(list)
     if detectors:
-        for loop in detectors.get('induction_loops', []):
-            edge_id = loop['lane'].rsplit('_', 1)[0]
-            if edge_id not in detector_map:
-                detector_map[edge_id] = []
-            detector_map[edge_id].append({'id': loop['id'], 'type': 'Induction Loop'})
-
-        for area in detectors.get('lane_area_detectors', []):
-            edge_id = area['lane'].rsplit('_', 1)[0]
-            if edge_id not in detector_map:
-                detector_map[edge_id] = []
-            detector_map[edge_id].append({'id': area['id'], 'type': 'Zone Detector'})
+        for key, det_type in (('induction_loops', 'Induction Loop'), ('lane_area_detectors', 'Zone Detector')):
+            for det in detectors.get(key, []):
+                edge_id = det['lane'].rsplit('_', 1)[0]
+                detector_ids[edge_id].append(det['id'])
+                detector_types[edge_id].append(det_type)
 
     data_list = []
-    for edge_id in sequential_order:
+    for edge_id in SEQUENTIAL_ORDER:
         if edge_id in edges:
             edge_data = edges[edge_id]
-            detector_ids = []
-            detector_types = []
-            if edge_id in detector_map:
-                for det in detector_map[edge_id]:
-                    detector_ids.append(det['id'])
-                    detector_types.append(det['type'])
+            category, section = EDGE_META[edge_id]
 
             data_list.append({
                 'Edge ID': edge_id,
-                'Category': categorize_edge(edge_id),
-                'Section': get_section(edge_id),
+                'Category': category,
+                'Section': section,
                 'From -> To': f"{edge_data['from']} -> {edge_data['to']}",
                 'Lanes': edge_data['num_lanes'],
                 'Speed (m/s)': round(edge_data['speed_ms'], 2),
                 'Speed (km/h)': round(edge_data['speed_kmh'], 1),
                 'Length (m)': round(edge_data['length_m'], 2),
                 'Priority': edge_data['priority'],
-                'Detector ID': ', '.join(detector_ids) if detector_ids else '',
-                'Detector Type': ', '.join(detector_types) if detector_types else '',
+                'Detector ID': ', '.join(detector_ids.get(edge_id, ())),
+                'Detector Type': ', '.join(detector_types.get(edge_id, ())),
             })
 
     return pd.DataFrame(data_list)
 
 
+def get_junction_edges(edges: Dict) -> Tuple[Dict, Dict]:
+    """Map each junction ID to its incoming and outgoing edge IDs (in edge order)."""
+    incoming = defaultdict(list)
+    outgoing = defaultdict(list)
+    for edge_id, edge_data in edges.items():
+        incoming[edge_data['to']].append(edge_id)
+        outgoing[edge_data['from']].append(edge_id)
+    return incoming, outgoing
+
+
 def create_junction_dataframe(junctions: Dict, edges: Dict) -> pd.DataFrame:
     """Create a pandas DataFrame from junctions dictionary with internal lane data."""
     data_list = []
+    incoming, outgoing = get_junction_edges(edges)
 
-    for junc_id, junc_data in junctions.items():
+    # Junctions in ID order and their internal lanes in file order give the table its final row order
+    for junc_id in sorted(junctions):
         if junc_id.startswith(':'):
             continue
+        junc_data = junctions[junc_id]
 
-        incoming_edges = [e_id for e_id, e in edges.items() if e['to'] == junc_id]
-        outgoing_edges = [e_id for e_id, e in edges.items() if e['from'] == junc_id]
+        incoming_edges = incoming.get(junc_id, [])
+        outgoing_edges = outgoing.get(junc_id, [])
         internal_edges = junc_data.get('internal_edges', [])
 
         if internal_edges:
@@ -272,66 +312,62 @@ def create_junction_dataframe(junctions: Dict, edges: Dict) -> pd.DataFrame:
                 'Total Connections': len(incoming_edges) + len(outgoing_edges),
             })
 
-    df = pd.DataFrame(data_list)
-    return df.sort_values(['Junction ID', 'Internal Lane']).reset_index(drop=True)
+    return pd.DataFrame(data_list)
 
 
-def get_junction_positions(junctions: Dict, edges: Dict, cumulative_pos: Dict) -> Dict:
+def get_junction_positions(junctions: Dict, incoming: Dict, cumulative_pos: Dict) -> Dict:
     """Calculate junction positions on the linear cumulative axis."""
     junction_positions = {}
     for junc_id, junc_data in junctions.items():
         if junc_data['type'] == 'dead_end':
             continue
-        for edge_id, edge_data in edges.items():
-            if edge_data['to'] == junc_id and edge_id in cumulative_pos and cumulative_pos[edge_id]['start'] is not None:
+        for edge_id in incoming.get(junc_id, []):
+            if edge_id in cumulative_pos and cumulative_pos[edge_id]['start'] is not None:
                 junction_positions[junc_id] = cumulative_pos[edge_id]['end']
                 break
     return junction_positions
 
 
-def get_junction_height(junction_id: str, edges: Dict, heights_map: Dict) -> float:
+def get_junction_height(junction_id: str, incoming: Dict, outgoing: Dict, heights_map: Dict) -> float:
     """Calculate junction height as maximum of adjacent edges."""
-    connected_edges = [e_id for e_id, e in edges.items() if e['from'] == junction_id or e['to'] == junction_id]
+    connected_edges = incoming.get(junction_id, []) + outgoing.get(junction_id, [])
     return max([heights_map.get(e, 0.5) for e in connected_edges]) if connected_edges else 0.5
 
 
-def plot_network_infrastructure(xml_file: str, detector_file: str, output_file: str, 
-                                with_traffic_lights: bool = False) -> None:
+def plot_network_infrastructure(edges: Dict, junctions: Dict, detectors: Dict, output_file: str,
+                                tl_junctions: Dict = None) -> None:
     """
     Create comprehensive network visualization with linear positioning.
     
     Args:
-        xml_file: Path to network XML file
-        detector_file: Path to detectors XML file
+        edges: Edges as returned by parse_network_xml
+        junctions: Junctions as returned by parse_junctions
+        detectors: Detectors as returned by parse_detectors
         output_file: Output filename
-        with_traffic_lights: Whether to parse and display traffic lights
+        tl_junctions: Traffic light junctions as returned by parse_traffic_lights;
+            traffic lights are only displayed when given
     """
-    # Parse data
-    edges = parse_network_xml(xml_file)
-    junctions = parse_junctions(xml_file)
-    detectors = parse_detectors(detector_file)
-    tl_junctions = parse_traffic_lights(xml_file) if with_traffic_lights else {}
+    with_traffic_lights = tl_junctions is not None
+    if not with_traffic_lights:
+        tl_junctions = {}
     df = create_edge_dataframe(edges)
 
-    # Calculate cumulative positions
-    cumulative_pos = {}
-    current_pos = 0
-    for _, row in df.iterrows():
-        edge_id = row['Edge ID']
-        category = row['Category']
-        if category in ['Mainline', 'Merge']:
-            cumulative_pos[edge_id] = {
-                'start': current_pos,
-                'end': current_pos + HORIZONTAL_EDGE_WIDTH,
-                'category': category
-            }
-            current_pos += HORIZONTAL_EDGE_WIDTH
-        else:
-            cumulative_pos[edge_id] = {'start': None, 'end': None, 'category': category}
-
-    junction_pos = get_junction_positions(junctions, edges, cumulative_pos)
+    # Calculate cumulative positions (mainline and merge edges are laid out back to back)
+    is_mainline = df['Category'].isin(['Mainline', 'Merge']).to_numpy()
+    ends = np.cumsum(is_mainline) * HORIZONTAL_EDGE_WIDTH
+    starts = ends - HORIZONTAL_EDGE_WIDTH
+    cumulative_pos = {
+        edge_id: {'start': int(start), 'end': int(end), 'category': category} if on_mainline
+        else {'start': None, 'end': None, 'category': category}
+        for edge_id, category, start, end, on_mainline
+        in zip(df['Edge ID'], df['Category'], starts, ends, is_mainline)
+    }
+    mainline_df = df[is_mainline]
+    offramp_df = df[df['Category'] == 'Off-ramp']
+
+    incoming, outgoing = get_junction_edges(edges)
+    junction_pos = get_junction_positions(junctions, incoming, cumulative_pos)
 
-    plt.rcParams.update(PLOT_STYLE)
     fig, ax = plt.subplots(figsize=(18, 10))
 
     y_mainline = 5
@@ -340,6 +376,9 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
     rm_junction_widths = {}
     en_junction_widths = {}  # Track EN junction widths
     ex_junction_widths = {}  # Track EX junction widths
+    # Rectangles are collected and added as one PatchCollection per layer (edges below junctions)
+    edge_patches = []
+    junction_patches = []
 
     # Calculate RM junction widths based on max of connected vertical edges
     for acc_id in ['E34_THA_ACC', 'E35_HOR_ACC', 'E36_WAED_ACC']:
@@ -355,99 +394,67 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
             en_junction_widths[to_junc] = acc_width
 
     # Calculate EX junction widths based on off-ramp widths
-    for _, row in df.iterrows():
-        if row['Category'] == 'Off-ramp':
-            edge_id = row['Edge ID']
-            from_junc = edges[edge_id]['from']
-            ex_junction_widths[from_junc] = edges[edge_id]['num_lanes'] * LANE_WIDTH
+    for edge_id in offramp_df['Edge ID']:
+        from_junc = edges[edge_id]['from']
+        ex_junction_widths[from_junc] = edges[edge_id]['num_lanes'] * LANE_WIDTH
 
     # Draw mainline and merge segments (adjusted to not overlap with junctions on BOTH sides)
-    for _, row in df.iterrows():
-        edge_id = row['Edge ID']
-        if row['Category'] in ['Mainline', 'Merge']:
-            start = cumulative_pos[edge_id]['start']
-            end = cumulative_pos[edge_id]['end']
-            height = row['Lanes'] * LANE_HEIGHT
-            edge_heights[edge_id] = height
-            color = COLOR_SCHEME['mainline'] if row['Category'] == 'Mainline' else COLOR_SCHEME['merge']
-            
-            # Adjust start position if this edge starts from a junction with vertical connections
-            from_junc = edges[edge_id]['from']
-            if from_junc in rm_junction_widths:
-                # Edge starts after RM junction
-                start += rm_junction_widths[from_junc] / 2
-            elif from_junc in en_junction_widths:
-                # Edge starts after EN junction
-                start += en_junction_widths[from_junc] / 2
-            elif from_junc in ex_junction_widths:
-                # Edge starts after EX junction
-                start += ex_junction_widths[from_junc] / 2
-            
-            # Adjust end position if this edge ends at a junction with vertical connections
-            to_junc = edges[edge_id]['to']
-            if to_junc in ex_junction_widths:
-                # Edge ends before EX junction
-                end -= ex_junction_widths[to_junc] / 2
-            elif to_junc in en_junction_widths:
-                # Edge ends before EN junction
-                end -= en_junction_widths[to_junc] / 2
-            elif to_junc in rm_junction_widths:
-                # Edge ends before RM junction
-                end -= rm_junction_widths[to_junc] / 2
-            
-            # Draw the adjusted horizontal bar (aligned to bottom)
-            adjusted_width = end - start
-            ax.barh(y_mainline, adjusted_width, left=start, height=height,
-                   color=color, edgecolor='black', linewidth=1.5, alpha=0.7, align='edge')
-            
-            mid_x = start + adjusted_width / 2
-            mid_y = y_mainline + height / 2
-            label = f"{edge_id}\n{row['Speed (km/h)']:.0f}km/h\n{row['Length (m)']:.0f}m | {row['Lanes']}L"
-            ax.text(mid_x, mid_y, label, ha='center', va='center', fontsize=7, weight='bold')
-
-    # Draw EN junctions first (at mainline level, where acceleration lanes connect)
-    for junc_id, position in junction_pos.items():
-        if junc_id in en_junction_widths and junc_id in junctions:
-            junc_height = get_junction_height(junc_id, edges, edge_heights)
-            junc_width = en_junction_widths[junc_id]
-            
-            junc_type = junctions[junc_id]['type']
-            if junc_type == 'traffic_light':
-                color, alpha = 'red', 0.9
-            elif junc_type == 'priority':
-                color, alpha = 'orange', 0.7
-            elif junc_type == 'unregulated':
-                color, alpha = 'gray', 0.6
-            else:
-                color, alpha = 'orange', 0.7
-
-            rect = Rectangle((position - junc_width/2, y_mainline), junc_width, junc_height,
-                           facecolor=color, edgecolor='black', linewidth=2, alpha=alpha, zorder=10)
-            ax.add_patch(rect)
-            ax.text(position, y_mainline + junc_height + 15, junc_id, fontsize=6, ha='center', va='bottom', weight='bold',
-                   bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
-
-    # Draw EX junctions (at mainline level, where off-ramps connect)
-    for junc_id, position in junction_pos.items():
-        if junc_id in ex_junction_widths and junc_id in junctions:
-            junc_height = get_junction_height(junc_id, edges, edge_heights)
-            junc_width = ex_junction_widths[junc_id]
-
-            junc_type = junctions[junc_id]['type']
-            if junc_type == 'traffic_light':
-                color, alpha = 'red', 0.9
-            elif junc_type == 'priority':
-                color, alpha = 'orange', 0.7
-            elif junc_type == 'unregulated':
-                color, alpha = 'gray', 0.6
-            else:
-                color, alpha = 'orange', 0.7
-
-            rect = Rectangle((position - junc_width/2, y_mainline), junc_width, junc_height,
-                           facecolor=color, edgecolor='black', linewidth=2, alpha=alpha, zorder=10)
-            ax.add_patch(rect)
-            ax.text(position, y_mainline + junc_height + 15, junc_id, fontsize=6, ha='center', va='bottom', weight='bold',
-                   bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
+    mainline_color, merge_color = COLOR_SCHEME['mainline'], COLOR_SCHEME['merge']
+    for edge_id, category, lanes, speed_kmh, length_m in zip(
+            mainline_df['Edge ID'].to_numpy(), mainline_df['Category'].to_numpy(), mainline_df['Lanes'].to_numpy(),
+            mainline_df['Speed (km/h)'].to_numpy(), mainline_df['Length (m)'].to_numpy()):
+        start = cumulative_pos[edge_id]['start']
+        end = cumulative_pos[edge_id]['end']
+        height = lanes * LANE_HEIGHT
+        edge_heights[edge_id] = height
+        color = mainline_color if category == 'Mainline' else merge_color
+        
+        # Adjust start position if this edge starts from a junction with vertical connections
+        from_junc = edges[edge_id]['from']
+        if from_junc in rm_junction_widths:
+            # Edge starts after RM junction
+            start += rm_junction_widths[from_junc] / 2
+        elif from_junc in en_junction_widths:
+            # Edge starts after EN junction
+            start += en_junction_widths[from_junc] / 2
+        elif from_junc in ex_junction_widths:
+            # Edge starts after EX junction
+            start += ex_junction_widths[from_junc] / 2
+        
+        # Adjust end position if this edge ends at a junction with vertical connections
+        to_junc = edges[edge_id]['to']
+        if to_junc in ex_junction_widths:
+            # Edge ends before EX junction
+            end -= ex_junction_widths[to_junc] / 2
+        elif to_junc in en_junction_widths:
+            # Edge ends before EN junction
+            end -= en_junction_widths[to_junc] / 2
+        elif to_junc in rm_junction_widths:
+            # Edge ends before RM junction
+            end -= rm_junction_widths[to_junc] / 2
+        
+        # Draw the adjusted horizontal bar (aligned to bottom)
+        adjusted_width = end - start
+        edge_patches.append(Rectangle((start, y_mainline), adjusted_width, height,
+                                      facecolor=color, edgecolor='black', linewidth=1.5, alpha=0.7))
+        
+        mid_x = start + adjusted_width / 2
+        mid_y = y_mainline + height / 2
+        label = f"{edge_id}\n{speed_kmh:.0f}km/h\n{length_m:.0f}m | {lanes}L"
+        ax.text(mid_x, mid_y, label, ha='center', va='center', fontsize=7, weight='bold')
+
+    # Draw EN junctions first, then EX junctions (at mainline level, where acceleration lanes / off-ramps connect)
+    for junction_widths in (en_junction_widths, ex_junction_widths):
+        for junc_id, position in junction_pos.items():
+            if junc_id in junction_widths and junc_id in junctions:
+                junc_height = get_junction_height(junc_id, incoming, outgoing, edge_heights)
+                junc_width = junction_widths[junc_id]
+                color, alpha = JUNCTION_STYLE.get(junctions[junc_id]['type'], DEFAULT_JUNCTION_STYLE)
+
+                junction_patches.append(Rectangle((position - junc_width/2, y_mainline), junc_width, junc_height,
+                                                  facecolor=color, edgecolor='black', linewidth=2, alpha=alpha))
+                ax.text(position, y_mainline + junc_height + 15, junc_id, fontsize=6, ha='center', va='bottom', weight='bold',
+                       bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
 
     # Draw acceleration lanes (connect to bottom of EN junction, avoid RM junction overlap)
     for acc_id in ['E34_THA_ACC', 'E35_HOR_ACC', 'E36_WAED_ACC']:
@@ -475,9 +482,8 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
             acc_lane_bottom = rm_y + rm_junction_height / 2
             acc_lane_height = acc_lane_top - acc_lane_bottom
             
-            rect = Rectangle((en_x - width/2, acc_lane_bottom), width, acc_lane_height,
-                           facecolor=COLOR_SCHEME['acceleration'], edgecolor='black', linewidth=1.5, alpha=0.7)
-            ax.add_patch(rect)
+            edge_patches.append(Rectangle((en_x - width/2, acc_lane_bottom), width, acc_lane_height,
+                                          facecolor=COLOR_SCHEME['acceleration'], edgecolor='black', linewidth=1.5, alpha=0.7))
             
             label = f"{acc_id}\n{edges[acc_id]['speed_kmh']:.0f}km/h\n{edges[acc_id]['length_m']:.0f}m"
             ax.text(en_x, acc_lane_bottom + acc_lane_height/2, label, ha='center', va='center', fontsize=7, weight='bold',
@@ -490,9 +496,8 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
         color = 'red' if rm_junc_id in tl_junctions else 'orange'
         alpha = 0.9 if rm_junc_id in tl_junctions else 0.7
         
-        rect = Rectangle((pos_data['x'] - width/2, pos_data['y'] - rm_junction_height/2), width, rm_junction_height,
-                       facecolor=color, edgecolor='black', linewidth=2, alpha=alpha, zorder=10)
-        ax.add_patch(rect)
+        junction_patches.append(Rectangle((pos_data['x'] - width/2, pos_data['y'] - rm_junction_height/2), width, rm_junction_height,
+                                          facecolor=color, edgecolor='black', linewidth=2, alpha=alpha))
         ax.text(pos_data['x'], pos_data['y'] + rm_junction_height/2 + 15, rm_junc_id, fontsize=6, ha='center', va='bottom', weight='bold',
                bbox=dict(boxstyle='round,pad=0.2', facecolor='white', alpha=0.8))
 
@@ -507,34 +512,35 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
             onramp_top = rm_pos['y'] - rm_junction_height / 2
             bottom_y = onramp_top - VERTICAL_EDGE_HEIGHT
             
-            rect = Rectangle((rm_pos['x'] - width/2, bottom_y), width, VERTICAL_EDGE_HEIGHT,
-                           facecolor=COLOR_SCHEME['on_ramp'], edgecolor='black', linewidth=1.5, alpha=0.7)
-            ax.add_patch(rect)
+            edge_patches.append(Rectangle((rm_pos['x'] - width/2, bottom_y), width, VERTICAL_EDGE_HEIGHT,
+                                          facecolor=COLOR_SCHEME['on_ramp'], edgecolor='black', linewidth=1.5, alpha=0.7))
             
             label = f"{onramp_id}\n{edges[onramp_id]['speed_kmh']:.0f}km/h\n{edges[onramp_id]['length_m']:.0f}m"
             ax.text(rm_pos['x'], bottom_y + VERTICAL_EDGE_HEIGHT/2, label, ha='center', va='center', fontsize=7, weight='bold',
                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
 
     # Draw off-ramps (connect to bottom of EX junction)
-    for _, row in df.iterrows():
-        if row['Category'] == 'Off-ramp' and edges[row['Edge ID']]['from'] in junction_pos:
-            ex_x = junction_pos[edges[row['Edge ID']]['from']]
+    for edge_id, speed_kmh, length_m in zip(offramp_df['Edge ID'], offramp_df['Speed (km/h)'], offramp_df['Length (m)']):
+        if edges[edge_id]['from'] in junction_pos:
+            ex_x = junction_pos[edges[edge_id]['from']]
             
-            width = edges[row['Edge ID']]['num_lanes'] * LANE_WIDTH
-            edge_heights[row['Edge ID']] = width
+            width = edges[edge_id]['num_lanes'] * LANE_WIDTH
+            edge_heights[edge_id] = width
             
             # Start at bottom of EX junction
             offramp_top = y_mainline
             bottom_y = offramp_top - VERTICAL_EDGE_HEIGHT
             
-            rect = Rectangle((ex_x - width/2, bottom_y), width, VERTICAL_EDGE_HEIGHT,
-                           facecolor=COLOR_SCHEME['off_ramp'], edgecolor='black', linewidth=1.5, alpha=0.7)
-            ax.add_patch(rect)
+            edge_patches.append(Rectangle((ex_x - width/2, bottom_y), width, VERTICAL_EDGE_HEIGHT,
+                                          facecolor=COLOR_SCHEME['off_ramp'], edgecolor='black', linewidth=1.5, alpha=0.7))
             
-            label = f"{row['Edge ID']}\n{row['Speed (km/h)']:.0f}km/h\n{row['Length (m)']:.0f}m"
+            label = f"{edge_id}\n{speed_kmh:.0f}km/h\n{length_m:.0f}m"
             ax.text(ex_x, bottom_y + VERTICAL_EDGE_HEIGHT/2, label, ha='center', va='center', fontsize=7, weight='bold',
                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
 
+    ax.add_collection(PatchCollection(edge_patches, match_original=True, zorder=1))
+    ax.add_collection(PatchCollection(junction_patches, match_original=True, zorder=10))
+
     # Draw traffic light icons (higher zorder)
     if with_traffic_lights:
         for tl_id in tl_junctions.keys():
@@ -546,36 +552,37 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
                 ax.text(pos['x'], pos['y'] + rm_junction_height/2 + 30, 'TL', fontsize=8,
                        ha='center', va='center', weight='bold', color='white', zorder=16)
 
-    # Draw detectors (HIGHEST zorder to be on top of junctions)
+    # Draw detectors (HIGHEST zorder to be on top of junctions); markers of one kind are drawn in one scatter call
+    # Induction loops on mainline edges: collect (id, edge start, edge length, pos, lane), then place them all at once
+    placed_loops = []
     for loop in detectors['induction_loops']:
         parts = loop['lane'].rsplit('_', 1)
         edge_id = parts[0]
-        lane_num = int(parts[1]) if len(parts) > 1 else 0
-
         if edge_id in cumulative_pos and cumulative_pos[edge_id]['start'] is not None:
-            edge_length = edges[edge_id]['length_m']
-            relative_pos = (edge_length + loop['pos']) / edge_length if loop['pos'] < 0 else loop['pos'] / edge_length
-            detector_x = cumulative_pos[edge_id]['start'] + (relative_pos * HORIZONTAL_EDGE_WIDTH)
-            
-            num_lanes = edges[edge_id]['num_lanes']
-            lane_offset = (lane_num + 0.5) * LANE_HEIGHT
-            detector_y = y_mainline + lane_offset
-
-            ax.plot(detector_x, detector_y, marker='D', markersize=8, color='cyan',
-                   markeredgecolor='black', markeredgewidth=1.5, zorder=20)
-            ax.text(detector_x, detector_y + LANE_HEIGHT * 0.6, loop['id'], fontsize=5, ha='center', va='bottom', rotation=90,
-                   bbox=dict(boxstyle='round,pad=0.2', facecolor='cyan', alpha=0.6), zorder=21)
+            lane_num = int(parts[1]) if len(parts) > 1 else 0
+            placed_loops.append((loop['id'], cumulative_pos[edge_id]['start'], edges[edge_id]['length_m'], loop['pos'], lane_num))
+
+    loop_start, loop_length, loop_pos, loop_lane = np.array([p[1:] for p in placed_loops], dtype=float).reshape(-1, 4).T
+    relative_pos = np.where(loop_pos < 0, loop_length + loop_pos, loop_pos) / loop_length  # negative pos counts from the edge end
+    loop_x = loop_start + relative_pos * HORIZONTAL_EDGE_WIDTH
+    loop_y = y_mainline + (loop_lane + 0.5) * LANE_HEIGHT
+    ax.scatter(loop_x, loop_y, marker='D', s=8**2, c='cyan', edgecolors='black', linewidths=1.5, zorder=20)
+    for (loop_id, *_), detector_x, detector_y in zip(placed_loops, loop_x, loop_y):
+        ax.text(detector_x, detector_y + LANE_HEIGHT * 0.6, loop_id, fontsize=5, ha='center', va='bottom', rotation=90,
+               bbox=dict(boxstyle='round,pad=0.2', facecolor='cyan', alpha=0.6), zorder=21)
 
     # Zone detectors (HIGHEST zorder)
+    zone_x, zone_y = [], []
     for area in detectors['lane_area_detectors']:
         edge_id = area['lane'].rsplit('_', 1)[0]
         if edge_id in ['E34_THA', 'E35_HOR', 'E36_WAED'] and edges[edge_id]['to'] in rm_junction_positions:
             pos = rm_junction_positions[edges[edge_id]['to']]
             y_detector = pos['y'] - rm_junction_height / 2  # At bottom of RM junction
-            ax.plot(pos['x'], y_detector, marker='^', markersize=10, color='lime',
-                   markeredgecolor='black', markeredgewidth=1.5, zorder=20)
+            zone_x.append(pos['x'])
+            zone_y.append(y_detector)
             ax.text(pos['x'] + LANE_WIDTH, y_detector, area['id'], fontsize=5, ha='left', va='center',
                    bbox=dict(boxstyle='round,pad=0.2', facecolor='lime', alpha=0.6), zorder=21)
+    ax.scatter(zone_x, zone_y, marker='^', s=10**2, c='lime', edgecolors='black', linewidths=1.5, zorder=20)
 
     # Legend
     legend_elements = [
@@ -608,15 +615,19 @@ def plot_network_infrastructure(xml_file: str, detector_file: str, output_file:
     ax.grid(axis='x', alpha=0.3)
     ax.set_axisbelow(True)
 
-    plt.tight_layout()
+    fig.tight_layout()
     os.makedirs(os.path.dirname(output_file), exist_ok=True)
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    # Measure the tight bbox once (a layout pass, nothing is rasterized) and crop both files to it,
+    # so savefig does not run its own measuring pass per format
+    fig.draw_without_rendering()
+    bbox = fig.get_tightbbox().padded(plt.rcParams['savefig.pad_inches'])
+    fig.savefig(output_file, dpi=300, bbox_inches=bbox)
     print(f"[OK] Network visualization saved: {output_file}")
     
     pdf_file = output_file.replace('.png', '.pdf')
-    plt.savefig(pdf_file, format='pdf', bbox_inches='tight')
+    fig.savefig(pdf_file, format='pdf', bbox_inches=bbox)
     print(f"[OK] Network visualization PDF saved: {pdf_file}")
-    plt.close()
+    plt.close(fig)
 
 
 def main():
@@ -627,8 +638,8 @@ def main():
 
     try:
         print("\n[1/4] Parsing network files...")
-        edges = parse_network_xml('shared_simulation_files/Network.net.xml')
-        junctions = parse_junctions('shared_simulation_files/Network.net.xml')
+        edges, junctions, _ = _parse_network('shared_simulation_files/Network.net.xml')
+        tl_edges, tl_net_junctions, tl_junctions = _parse_network('shared_simulation_files/Network_TL.net.xml')
         detectors = parse_detectors('shared_simulation_files/detectors.add.xml')
         print(f"[OK] Parsed {len(edges)} edges, {len(junctions)} junctions")
 
@@ -640,21 +651,18 @@ def main():
         print("\n[3/4] Saving to Excel...")
         os.makedirs('infrastructure_data', exist_ok=True)
         excel_file = 'infrastructure_data/network_infrastructure_list.xlsx'
-        with pd.ExcelWriter(excel_file, engine='openpyxl') as writer:
+        with pd.ExcelWriter(excel_file, engine=EXCEL_ENGINE) as writer:
             df_edges.to_excel(writer, index=False, sheet_name='Edges')
             df_junctions.to_excel(writer, index=False, sheet_name='Junctions')
         print(f"[OK] Saved to {excel_file}")
 
         print("\n[4/4] Creating visualizations...")
-        plot_network_infrastructure('shared_simulation_files/Network.net.xml', 
-                                   'shared_simulation_files/detectors.add.xml',
-                                   'infrastructure_data/network_with_junctions.png',
-                                   with_traffic_lights=False)
+        plot_network_infrastructure(edges, junctions, detectors,
+                                    'infrastructure_data/network_with_junctions.png')
         
-        plot_network_infrastructure('shared_simulation_files/Network_TL.net.xml', 
-                                   'shared_simulation_files/detectors.add.xml',
-                                   'infrastructure_data/network_with_junctions_and_tl.png',
-                                   with_traffic_lights=True)
+        plot_network_infrastructure(tl_edges, tl_net_junctions, detectors,
+                                    'infrastructure_data/network_with_junctions_and_tl.png',
+                                    tl_junctions=tl_junctions)
 
         print("\n" + "="*100)
         print("ANALYSIS COMPLETE")
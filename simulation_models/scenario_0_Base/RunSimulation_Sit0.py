@@ -4,8 +4,18 @@
 # ==========================
 import os
 import sys
-import traci
-import time
+# Runs are headless by default; set SUMO_GUI=1 to watch the simulation in sumo-gui
+SUMO_GUI = os.environ.get("SUMO_GUI", "0") == "1"
+# libsumo runs SUMO in-process (no TraCI socket) but cannot drive the GUI;
+# set USE_LIBSUMO=0 to drive SUMO over TraCI instead
+USE_LIBSUMO = os.environ.get("USE_LIBSUMO", "1") == "1" and not SUMO_GUI
+if USE_LIBSUMO:
+	try:
+		import libsumo as traci
+	except ImportError:  # libsumo is not shipped with every SUMO install; fall back to TraCI
+		USE_LIBSUMO = False
+if not USE_LIBSUMO:
+	import traci
 
 #%%
 # ==========================
@@ -23,19 +33,28 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # ==========================
 TRAFFIC_SCALE = 1  # Scale traffic (adjust between 0.0 and 1.0)
 
-sumoBinary = r"C:\Program Files (x86)\Eclipse\Sumo\bin\sumo-gui.exe"
+if SUMO_GUI:
+	sumoBinary = r"C:\Program Files (x86)\Eclipse\Sumo\bin\sumo-gui.exe"
+else:
+	sumoBinary = r"C:\Program Files (x86)\Eclipse\Sumo\bin\sumo.exe"
 # Use relative path to config file in same directory as script
 sumoConfigFile = os.path.join(script_dir, "Configuration_Sit0.sumocfg")
-sumoCmd = [sumoBinary, "-c", sumoConfigFile, "--start", "--quit-on-end", "--time-to-teleport", "-1", "--scale", str(TRAFFIC_SCALE)]
+sumoCmd = [sumoBinary, "-c", sumoConfigFile, "--time-to-teleport", "-1", "--scale", str(TRAFFIC_SCALE)]
+if SUMO_GUI:
+	sumoCmd += ["--start", "--quit-on-end"]  # GUI-only options
+else:
+	# Headless runs: no per-step progress line or warnings on stdout, and no schema validation of the inputs
+	sumoCmd += ["--no-step-log", "true", "--no-warnings", "true", "--xml-validation", "never"]
 traci.start(sumoCmd)
 
 # ==========================
 # Simulation (Scenario 0: No RM)
 # ==========================
-print("Simulation step length (DeltaT):", traci.simulation.getDeltaT(), "s")
-for step in range(4500):
-	traci.simulationStep()
-	time.sleep(0)
+SIM_STEPS = 4500
+DT = traci.simulation.getDeltaT()
+print("Simulation step length (DeltaT):", DT, "s")
+# Without ramp control there is nothing to do between steps, so SUMO runs to the end in one call
+traci.simulationStep(SIM_STEPS * DT)
 
 traci.close()
 
@@ -4,11 +4,31 @@
 # ==========================
 import os
 import sys
-import traci
-import time
+# Runs are headless by default; set SUMO_GUI=1 to watch the simulation in sumo-gui
+SUMO_GUI = os.environ.get("SUMO_GUI", "0") == "1"
+# libsumo runs SUMO in-process (no TraCI socket) but cannot drive the GUI;
+# set USE_LIBSUMO=0 to drive SUMO over TraCI instead
+USE_LIBSUMO = os.environ.get("USE_LIBSUMO", "1") == "1" and not SUMO_GUI
+# Plots are saved to simulation_output; set SHOW_PLOTS=1 to also open them in a window
+SHOW_PLOTS = os.environ.get("SHOW_PLOTS", "0") == "1"
+if USE_LIBSUMO:
+	try:
+		import libsumo as traci
+	except ImportError:  # libsumo is not shipped with every SUMO install; fall back to TraCI
+		USE_LIBSUMO = False
+if not USE_LIBSUMO:
+	import traci
+import traci.constants as tc
 import numpy as np
-import math
+import matplotlib
+if not SHOW_PLOTS:
+	matplotlib.use("Agg")  # figures are only saved to file, no GUI canvas needed
 import matplotlib.pyplot as plt
+try:
+	from numba import njit
+except ImportError:  # numba is optional; without it the controller runs as plain Python
+	def njit(*args, **kwargs):
+		return lambda func: func
 
 #%%
 # ==========================
@@ -26,10 +46,18 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 # ==========================
 TRAFFIC_SCALE = 1  # Scale traffic (adjust between 0.0 and 1.0)
 
-sumoBinary = r"C:\Program Files (x86)\Eclipse\Sumo\bin\sumo-gui.exe"
+if SUMO_GUI:
+	sumoBinary = r"C:\Program Files (x86)\Eclipse\Sumo\bin\sumo-gui.exe"
+else:
+	sumoBinary = r"C:\Program Files (x86)\Eclipse\Sumo\bin\sumo.exe"
 # Use relative path to config file in same directory as script
 sumoConfigFile = os.path.join(script_dir, "Configuration_Sit1.sumocfg")
-sumoCmd = [sumoBinary, "-c", sumoConfigFile, "--start", "--quit-on-end", "--time-to-teleport", "-1", "--scale", str(TRAFFIC_SCALE)]
+sumoCmd = [sumoBinary, "-c", sumoConfigFile, "--time-to-teleport", "-1", "--scale", str(TRAFFIC_SCALE)]
+if SUMO_GUI:
+	sumoCmd += ["--start", "--quit-on-end"]  # GUI-only options
+else:
+	# Headless runs: no per-step progress line or warnings on stdout, and no schema validation of the inputs
+	sumoCmd += ["--no-step-log", "true", "--no-warnings", "true", "--xml-validation", "never"]
 traci.start(sumoCmd)
 
 # ==========================
@@ -37,6 +65,8 @@ traci.start(sumoCmd)
 # ==========================
 STEPS_PER_SECOND = 1  # steps/sec
 SIGNAL_CYCLE_DURATION = 30 # sec
+# Green time (sec) per discretized metering rate 0.0, 0.1, ..., 1.0, indexed by int(metering_rate * 10)
+GREEN_TIMES = tuple(int((bucket / 10) * SIGNAL_CYCLE_DURATION) for bucket in range(11))
 VEHICLE_AV_ACC_TIME = 2.0  # sec/veh
 RECORDING_CONTROL_STATS_START_TIME = 240.0
 Q_MIN = 0       # veh/h
@@ -65,10 +95,22 @@ traffic_light_HOR = "RM_HOR"
 ramp_WAE = "Waedenswil"								
 traffic_light_WAE = "RM_WAED"
 
+# Ramp configurations (name, signal, queue limit), in the row order of the recorded metric arrays
+RAMPS = (
+	(ramp_THA, traffic_light_THA, QUEUE_MAX_LENGTH_RAMP_THA),
+	(ramp_HOR, traffic_light_HOR, QUEUE_MAX_LENGTH_RAMP_HOR),
+	(ramp_WAE, traffic_light_WAE, QUEUE_MAX_LENGTH_RAMP_WAE),
+)
+# Detector and signal IDs per ramp, in RAMPS order
+MID_IDS = (("SENS_A3_THA_MID0", "SENS_A3_THA_MID1"), ("SENS_A3_HOR_MID0", "SENS_A3_HOR_MID1"), ("SENS_A3_WAE_MID0", "SENS_A3_WAE_MID1"))  # mainline loops
+RAMP_IDS = ("SENS_E_THA", "SENS_E_HOR", "SENS_E_WAE")  # ramp lanearea detectors
+TL_IDS = tuple(traffic_light for _, traffic_light, _ in RAMPS)
+
 
 # ==========================
 # RAMP ALINEA CONTROL FUNCTION
 # ==========================
+@njit(cache=True, fastmath=True)  # compiled once and cached; the module constants are frozen in at compile time
 def control_ALINEA(ramp, q_previous_rate, occupancy_measured, queuelength, QUEUE_MAX_LENGTH_RAMP, FLUSH):
 	"""
 	ALINEA control logic for a single ramp.
@@ -81,6 +123,7 @@ def control_ALINEA(ramp, q_previous_rate, occupancy_measured, queuelength, QUEUE
 	Returns:
 	- q_rate: Updated flow rate (veh/h)
 	- metering_rate: Green share for ramp (0..1)
+	- bucket: metering_rate in tenths (0..10), the index into GREEN_TIMES
 	"""
 	
 	print(ramp)
@@ -92,19 +135,22 @@ def control_ALINEA(ramp, q_previous_rate, occupancy_measured, queuelength, QUEUE
 	print(q_bounded)
 	# Compute metering rate as fraction of signal cycle
 	metering_rate = (q_bounded * VEHICLE_AV_ACC_TIME) / 3600
-	metering_rate = min(1.0, math.floor(metering_rate * 10) / 10)  # discretize
+	bucket = min(10, int(metering_rate * 10))  # discretize to tenths (rate is never negative, so int() floors)
+	metering_rate = bucket / 10
 	if queuelength < 15:
 		FLUSH = 0
 	elif queuelength > 80:
 		# Ramp queue too long, increase green 
 		FLUSH = 1
 		metering_rate = 1
+		bucket = 10
 		print("FLUSH")
 	elif FLUSH == 1:
 		metering_rate = 1
+		bucket = 10
 		print("FLUSH")
 	print(metering_rate)
-	return q_bounded, metering_rate, FLUSH
+	return q_bounded, metering_rate, bucket, FLUSH
 
 
 
@@ -114,152 +160,149 @@ def control_ALINEA(ramp, q_previous_rate, occupancy_measured, queuelength, QUEUE
 # ==========================
 # Simulation
 # ==========================
-print("Simulation step length (DeltaT):", traci.simulation.getDeltaT(), "s")
+DT = traci.simulation.getDeltaT()
+print("Simulation step length (DeltaT):", DT, "s")
+# Subscribe once to every detector value the controller reads; SUMO then returns them
+# with each simulation step instead of answering one request per value
+for mid_ids in MID_IDS:
+	for det_id in mid_ids:
+		traci.inductionloop.subscribe(det_id, [tc.VAR_LAST_INTERVAL_OCCUPANCY])
+for det_id in RAMP_IDS:
+	# the IDs of the vehicles on the ramp come with the other ramp values; their speeds are read per vehicle
+	traci.lanearea.subscribe(det_id, [tc.LAST_STEP_VEHICLE_NUMBER, tc.VAR_LAST_INTERVAL_OCCUPANCY, tc.LAST_STEP_VEHICLE_ID_LIST])
+# The ramp signal programs are static: fetch them once and only rewrite the phase durations per control step
+tl_logic = {tl: traci.trafficlight.getAllProgramLogics(tl)[0] for tl in TL_IDS}
+tl_phases = {tl: (logic.phases[0], logic.phases[1]) for tl, logic in tl_logic.items()}  # (green, red)
+tl_green_applied = dict.fromkeys(TL_IDS)  # green duration last sent to each signal, None before the first update
+SIM_STEPS = 4500
 STEP_INTERVAL = 30  # update every 30 simulation steps
-q_rate_prev_THA, q_rate_prev_HOR, q_rate_prev_WAE = 1800, 1800, 1800 # Previous flow rate for individual ramps
-occList_THA, occList_HOR, occList_WAE = [], [], []
-numVEHList_THA, numVEHList_HOR, numVEHList_WAE = [], [], []
-QUEUEList_THA, QUEUEList_HOR, QUEUEList_WAE = [], [], []
-meteringrateList_THA, meteringrateList_HOR, meteringrateList_WAE = [], [], []
-reddurationList_THA, reddurationList_HOR, reddurationList_WAE = [], [], []
-QUEUEoccList_THA, QUEUEoccList_HOR, QUEUEoccList_WAE = [], [], []
-for step in range(4500):            
-	traci.simulationStep()
-	
-	if step > RECORDING_CONTROL_STATS_START_TIME and step % STEP_INTERVAL == 0:
-		print(f"Step:{step}")
-		print("------------------")
-		# get occupancies for ALINEA and append to list
-		occ_THA_0 = traci.inductionloop.getLastIntervalOccupancy("SENS_A3_THA_MID0")
-		occ_THA_1 = traci.inductionloop.getLastIntervalOccupancy("SENS_A3_THA_MID1")
-		occ_HOR_0 = traci.inductionloop.getLastIntervalOccupancy("SENS_A3_HOR_MID0")
-		occ_HOR_1 = traci.inductionloop.getLastIntervalOccupancy("SENS_A3_HOR_MID1")
-		occ_WAE_0 = traci.inductionloop.getLastIntervalOccupancy("SENS_A3_WAE_MID0")
-		occ_WAE_1 = traci.inductionloop.getLastIntervalOccupancy("SENS_A3_WAE_MID1")
-		occ_THA = (occ_THA_0 + occ_THA_1)/2
-		occ_HOR = (occ_HOR_0 + occ_HOR_1)/2
-		occ_WAE = (occ_WAE_0 + occ_WAE_1)/2
-		occList_THA.append(occ_THA)
-		occList_HOR.append(occ_HOR)
-		occList_WAE.append(occ_WAE)
-		# get number of cars on the ramp
-		numVEH_THA = traci.lanearea.getLastStepVehicleNumber("SENS_E_THA")
-		numVEH_HOR = traci.lanearea.getLastStepVehicleNumber("SENS_E_HOR")
-		numVEH_WAE = traci.lanearea.getLastStepVehicleNumber("SENS_E_WAE")
-		numVEHList_THA.append(numVEH_THA)
-		numVEHList_HOR.append(numVEH_HOR)
-		numVEHList_WAE.append(numVEH_WAE)
-		# get number of cars standing on the ramp
-		VEH_THA = traci.lanearea.getLastStepVehicleIDs("SENS_E_THA")
-		VEH_HOR = traci.lanearea.getLastStepVehicleIDs("SENS_E_HOR")
-		VEH_WAE = traci.lanearea.getLastStepVehicleIDs("SENS_E_WAE")
-		QUEUEstep_THA = sum(1 for veh_id in VEH_THA if traci.vehicle.getSpeed(veh_id) < 0.01)
-		QUEUEstep_HOR = sum(1 for veh_id in VEH_HOR if traci.vehicle.getSpeed(veh_id) < 0.01)
-		QUEUEstep_WAE = sum(1 for veh_id in VEH_WAE if traci.vehicle.getSpeed(veh_id) < 0.01)
-		QUEUEList_THA.append(QUEUEstep_THA)
-		QUEUEList_HOR.append(QUEUEstep_HOR)
-		QUEUEList_WAE.append(QUEUEstep_WAE)
-		# get occupancy on ramp
-		QUEUE_occ_THA = traci.lanearea.getLastIntervalOccupancy("SENS_E_THA")
-		QUEUE_occ_HOR = traci.lanearea.getLastIntervalOccupancy("SENS_E_HOR")
-		QUEUE_occ_WAE = traci.lanearea.getLastIntervalOccupancy("SENS_E_WAE")
-		QUEUEoccList_THA.append(QUEUE_occ_THA)
-		QUEUEoccList_HOR.append(QUEUE_occ_HOR)
-		QUEUEoccList_WAE.append(QUEUE_occ_WAE)
-
-
-		# Apply ALINEA control for THA
-		# ==============================
-		q_rate_prev_THA, metering_rate_THA, FLUSH_THA = control_ALINEA(ramp_THA, q_rate_prev_THA, occ_THA, QUEUE_occ_THA, QUEUE_MAX_LENGTH_RAMP_THA, FLUSH_THA)
-		meteringrateList_THA.append(metering_rate_THA)
-		# Convert metering rate to green duration
-		green_duration_THA = int(metering_rate_THA*SIGNAL_CYCLE_DURATION)
-		red_duration_THA = SIGNAL_CYCLE_DURATION - green_duration_THA
-		reddurationList_THA.append(red_duration_THA)       
-		# Get current traffic light logic
-		traffic_light_logic_THA = traci.trafficlight.getAllProgramLogics(traffic_light_THA)[0]
-		# Apply new green duration to the ramp signal
-		for ph_id in range(len(traffic_light_logic_THA.phases)):
-			if ph_id == 0:  # green phase
-				traffic_light_logic_THA.phases[ph_id].minDur = green_duration_THA
-				traffic_light_logic_THA.phases[ph_id].maxDur = green_duration_THA
-				traffic_light_logic_THA.phases[ph_id].duration = green_duration_THA
-			elif ph_id == 1:  # red phase
-				traffic_light_logic_THA.phases[ph_id].minDur = red_duration_THA
-				traffic_light_logic_THA.phases[ph_id].maxDur = red_duration_THA
-				traffic_light_logic_THA.phases[ph_id].duration = red_duration_THA
-		# Apply updated logic to the traffic light
-		traci.trafficlight.setProgramLogic(traffic_light_THA, traffic_light_logic_THA)
-		# Reset to green phase so new durations take effect immediately
-		traci.trafficlight.setPhase(traffic_light_THA, 0)
-
-		# Apply ALINEA control for HOR
-		# ==============================
-		q_rate_prev_HOR, metering_rate_HOR, FLUSH_HOR = control_ALINEA(ramp_HOR, q_rate_prev_HOR, occ_HOR, QUEUE_occ_HOR, QUEUE_MAX_LENGTH_RAMP_HOR, FLUSH_HOR)
-		meteringrateList_HOR.append(metering_rate_HOR)
-		# Convert metering rate to red duration
-		green_duration_HOR = int(metering_rate_HOR*SIGNAL_CYCLE_DURATION)
-		red_duration_HOR = SIGNAL_CYCLE_DURATION - green_duration_HOR
-		reddurationList_HOR.append(red_duration_HOR)       
-		# Get current traffic light logic
-		traffic_light_logic_HOR = traci.trafficlight.getAllProgramLogics(traffic_light_HOR)[0]
-		# Apply new green duration to the ramp signal
-		for ph_id in range(len(traffic_light_logic_HOR.phases)):
-			if ph_id == 0:  # green phase
-				traffic_light_logic_HOR.phases[ph_id].minDur = green_duration_HOR
-				traffic_light_logic_HOR.phases[ph_id].maxDur = green_duration_HOR
-				traffic_light_logic_HOR.phases[ph_id].duration = green_duration_HOR
-			elif ph_id == 1:  # red phase
-				traffic_light_logic_HOR.phases[ph_id].minDur = red_duration_HOR
-				traffic_light_logic_HOR.phases[ph_id].maxDur = red_duration_HOR
-				traffic_light_logic_HOR.phases[ph_id].duration = red_duration_HOR
-		# Apply updated logic to the traffic light
-		traci.trafficlight.setProgramLogic(traffic_light_HOR, traffic_light_logic_HOR)
-		# Reset to green phase so new durations take effect immediately
-		traci.trafficlight.setPhase(traffic_light_HOR, 0)
-
-		# Apply ALINEA control for WAE
-		# ==============================
-		q_rate_prev_WAE, metering_rate_WAE, FLUSH_WAE = control_ALINEA(ramp_WAE, q_rate_prev_WAE, occ_WAE, QUEUE_occ_WAE, QUEUE_MAX_LENGTH_RAMP_WAE, FLUSH_WAE)
-		meteringrateList_WAE.append(metering_rate_WAE)
-		# Convert metering rate to red duration
-		green_duration_WAE = int(metering_rate_WAE*SIGNAL_CYCLE_DURATION)
-		red_duration_WAE = SIGNAL_CYCLE_DURATION - green_duration_WAE
-		print("red", red_duration_WAE)
-		reddurationList_WAE.append(red_duration_WAE)       
-		# Get current traffic light logic
-		traffic_light_logic_WAE = traci.trafficlight.getAllProgramLogics(traffic_light_WAE)[0]
-		# Apply new green duration to the ramp signal
-		for ph_id in range(len(traffic_light_logic_WAE.phases)):
-			if ph_id == 0:  # green phase
-				traffic_light_logic_WAE.phases[ph_id].minDur = green_duration_WAE
-				traffic_light_logic_WAE.phases[ph_id].maxDur = green_duration_WAE
-				traffic_light_logic_WAE.phases[ph_id].duration = green_duration_WAE
-			elif ph_id == 1:  # red phase
-				traffic_light_logic_WAE.phases[ph_id].minDur = red_duration_WAE
-				traffic_light_logic_WAE.phases[ph_id].maxDur = red_duration_WAE
-				traffic_light_logic_WAE.phases[ph_id].duration = red_duration_WAE
-		# Apply updated logic to the traffic light
-		traci.trafficlight.setProgramLogic(traffic_light_WAE, traffic_light_logic_WAE)
+q_rate_prev = [1800, 1800, 1800]  # Previous flow rate for individual ramps, in RAMPS order
+flush = [FLUSH_THA, FLUSH_HOR, FLUSH_WAE]  # Flush state for individual ramps, in RAMPS order
+# Control samples are taken at every STEP_INTERVAL-th step after the recording start, so their
+# number is known up front and the series are written by index into preallocated arrays
+FIRST_CONTROL_STEP = (int(RECORDING_CONTROL_STATS_START_TIME) // STEP_INTERVAL + 1) * STEP_INTERVAL
+N_CONTROL = len(range(FIRST_CONTROL_STEP, SIM_STEPS, STEP_INTERVAL))
+# One (ramp, sample) block per metric, rows in THA/HOR/WAE order; the per-ramp names are row views
+occArr = np.empty((3, N_CONTROL), dtype=np.float32)
+occArr_THA, occArr_HOR, occArr_WAE = occArr
+numVEHArr = np.empty((3, N_CONTROL), dtype=np.float32)
+numVEHArr_THA, numVEHArr_HOR, numVEHArr_WAE = numVEHArr
+QUEUEArr = np.empty((3, N_CONTROL), dtype=np.float32)
+QUEUEArr_THA, QUEUEArr_HOR, QUEUEArr_WAE = QUEUEArr
+meteringrateArr = np.empty((3, N_CONTROL), dtype=np.float32)
+meteringrateArr_THA, meteringrateArr_HOR, meteringrateArr_WAE = meteringrateArr
+reddurationArr = np.empty((3, N_CONTROL), dtype=np.float32)
+reddurationArr_THA, reddurationArr_HOR, reddurationArr_WAE = reddurationArr
+QUEUEoccArr = np.empty((3, N_CONTROL), dtype=np.float32)
+QUEUEoccArr_THA, QUEUEoccArr_HOR, QUEUEoccArr_WAE = QUEUEoccArr
+idx = 0  # next free sample slot
+# Hot TraCI calls bound to module-level names once, so the loop skips the attribute lookups per call
+_step = traci.simulationStep
+_il_all_results = traci.inductionloop.getAllSubscriptionResults
+_la_all_results = traci.lanearea.getAllSubscriptionResults
+_veh_speed = traci.vehicle.getSpeed
+_tl_set_logic = traci.trafficlight.setProgramLogic
+_tl_set_phase = traci.trafficlight.setPhase
+# Only every STEP_INTERVAL-th step needs Python-side work, so SUMO is advanced in one call
+# straight to the end of each control step instead of one call per simulation step
+for step in range(FIRST_CONTROL_STEP, SIM_STEPS, STEP_INTERVAL):
+	_step((step + 1) * DT)
+
+	print(f"Step:{step}")
+	print("------------------")
+	# Fetch the subscribed values of all detectors at once per domain, then read the detectors of every ramp
+	il_results = _il_all_results()
+	la_results = _la_all_results()
+	occ, queue_occ = [], []  # controller inputs, in RAMPS order
+	for r in range(len(RAMPS)):
+		mid0, mid1 = MID_IDS[r]
+		ramp_id = RAMP_IDS[r]
+		# mainline occupancy for ALINEA (mean of both lanes)
+		occ_r = (il_results[mid0][tc.VAR_LAST_INTERVAL_OCCUPANCY] + il_results[mid1][tc.VAR_LAST_INTERVAL_OCCUPANCY])/2
+		occ.append(occ_r)
+		occArr[r, idx] = occ_r
+		# number of cars on the ramp and occupancy of the ramp
+		ramp_results = la_results[ramp_id]
+		numVEHArr[r, idx] = ramp_results[tc.LAST_STEP_VEHICLE_NUMBER]
+		queue_occ_r = ramp_results[tc.VAR_LAST_INTERVAL_OCCUPANCY]
+		queue_occ.append(queue_occ_r)
+		QUEUEoccArr[r, idx] = queue_occ_r
+		# number of cars standing on the ramp
+		vehicle_ids = ramp_results[tc.LAST_STEP_VEHICLE_ID_LIST]
+		speeds = np.fromiter((_veh_speed(veh_id) for veh_id in vehicle_ids), dtype=np.float64, count=len(vehicle_ids))
+		QUEUEArr[r, idx] = int((speeds < 0.01).sum())
+
+
+	# Apply ALINEA control and update the signal of each ramp
+	# ==============================
+	for r, (ramp, traffic_light, queue_max_length) in enumerate(RAMPS):
+		# Apply ALINEA control
+		q_rate_prev[r], metering_rate, bucket, flush[r] = control_ALINEA(ramp, q_rate_prev[r], occ[r], queue_occ[r], queue_max_length, flush[r])
+		meteringrateArr[r, idx] = metering_rate
+		# Convert metering rate to green/red duration
+		green_duration = GREEN_TIMES[bucket]
+		red_duration = SIGNAL_CYCLE_DURATION - green_duration
+		reddurationArr[r, idx] = red_duration
+		# Apply new durations to the ramp signal; the program is only resent when the split changed,
+		# since setPhase below restarts the cycle either way
+		if green_duration != tl_green_applied[traffic_light]:
+			phase_green, phase_red = tl_phases[traffic_light]
+			phase_green.minDur = phase_green.maxDur = phase_green.duration = green_duration
+			phase_red.minDur = phase_red.maxDur = phase_red.duration = red_duration
+			_tl_set_logic(traffic_light, tl_logic[traffic_light])
+			tl_green_applied[traffic_light] = green_duration
 		# Reset to green phase so new durations take effect immediately
-		traci.trafficlight.setPhase(traffic_light_WAE, 0)
+		_tl_set_phase(traffic_light, 0)
+	idx += 1
+
+# Run out the steps after the last control update
+traci.simulationStep(SIM_STEPS * DT)
 
-	time.sleep(0)
-	
 traci.close()
 #print(f"Collected Occupancies on main line: ", occupancy_main1)
 
+# Per-ramp summary, one reduction per metric over its (ramp, sample) block
+occ_mean, occ_max = occArr[:, :idx].mean(axis=1), occArr[:, :idx].max(axis=1)
+queue_mean, queue_max = QUEUEArr[:, :idx].mean(axis=1), QUEUEArr[:, :idx].max(axis=1)
+rate_mean = meteringrateArr[:, :idx].mean(axis=1)
+for r, ramp in enumerate((ramp_THA, ramp_HOR, ramp_WAE)):
+	print(f"{ramp}:")
+	print(f"  Average Mainline Occupancy: {occ_mean[r]:.2f}% (max {occ_max[r]:.2f}%)")
+	print(f"  Average Standing Queue: {queue_mean[r]:.1f} veh (max {queue_max[r]:.0f} veh)")
+	print(f"  Average Metering Rate: {rate_mean[r]:.2f}")
+
+#%%
+# ==========================
+# CONTROL STATISTICS EXPORT
+# ==========================
+# All control series in one CSV next to the simulation output: one row per control step,
+# one column per metric and ramp, written in a single call from the (ramp, sample) blocks
+output_dir = os.path.join(script_dir, "..", "..", "simulation_output", os.path.basename(script_dir))
+os.makedirs(output_dir, exist_ok=True)
+control_series = {
+	"occ": occArr, "numVEH": numVEHArr, "QUEUE": QUEUEArr,
+	"meteringrate": meteringrateArr, "redduration": reddurationArr, "QUEUEocc": QUEUEoccArr,
+}
+columns = ["step"] + [f"{metric}_{ramp}" for metric in control_series for ramp in ("THA", "HOR", "WAE")]
+control_table = np.column_stack(
+	[np.arange(FIRST_CONTROL_STEP, SIM_STEPS, STEP_INTERVAL)[:idx]] + [arr[:, :idx].T for arr in control_series.values()]
+)
+np.savetxt(os.path.join(output_dir, "control_stats_sit1.csv"), control_table,
+	fmt="%.4f", delimiter=",", header=",".join(columns), comments="")
+
 #%%
 # ==========================
 # PLOTS
 # ==========================
-time_steps = range(len(occList_WAE))
-occPLOT_WAE = np.array(occList_WAE)        
-num_vehPLOT_WAE = np.array(numVEHList_WAE)
-reddurationPLOT_WAE = np.array(reddurationList_WAE)
-queuePLOT_WAE = np.array(QUEUEList_WAE)
+plot_dir = os.path.join(output_dir, "plots_sit1")
+os.makedirs(plot_dir, exist_ok=True)
+time_steps = np.arange(idx, dtype=np.int32)  # built once, shared by every series on the figure
+occPLOT_WAE = occArr_WAE[:idx]        
+num_vehPLOT_WAE = numVEHArr_WAE[:idx]
+reddurationPLOT_WAE = reddurationArr_WAE[:idx]
+queuePLOT_WAE = QUEUEArr_WAE[:idx]
 
-fig, ax1 = plt.subplots(figsize=(12, 6))
+fig, ax1 = plt.subplots(figsize=(12, 6), constrained_layout=True)
 
 # Left axis: mainline occupancy, ramp queue, metering rate
 ax1.plot(time_steps, occPLOT_WAE, label='Occupancy on main line(%)', color='blue', linewidth=2)
@@ -277,8 +320,10 @@ ax2.set_ylabel('Red Duration (s)')
 ax2.legend(loc='upper right')
 
 plt.title('Ramp Metering Evolution over Simulation Steps for Waedenswil')
-plt.tight_layout()
-plt.show()
+fig.savefig(os.path.join(plot_dir, "ramp_metering_WAE.png"), dpi=300)
+if SHOW_PLOTS:
+	plt.show()
+plt.close(fig)
 
 
 # %%